@@ -3,92 +3,98 @@ Configuration management for the Algorithmic Trading Platform.
 Handles environment variables, AWS SSM integration, and settings validation.
 """
 
+import asyncio
+import json
 import os
-from typing import List, Optional
+import time
+from typing import Dict, List, Optional, Tuple, Union
 from functools import lru_cache
 
-from pydantic import BaseSettings, Field, validator
-from pydantic_settings import BaseSettings as PydanticBaseSettings
+from pydantic import Field, field_validator
+from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
-class Settings(PydanticBaseSettings):
+# CORS list settings accept a JSON array or a legacy comma-separated string.
+# The str arm lets pydantic-settings hand non-JSON values to the validator.
+StrTuple = Union[Tuple[str, ...], str]
+
+
+class Settings(BaseSettings):
     """Application settings with environment variable support."""
     
     # Application Settings
-    app_name: str = Field(default="AlgoTrader", env="APP_NAME")
-    app_version: str = Field(default="1.0.0", env="APP_VERSION")
-    debug: bool = Field(default=False, env="DEBUG")
-    environment: str = Field(default="production", env="ENVIRONMENT")
+    app_name: str = Field(default="AlgoTrader")
+    app_version: str = Field(default="1.0.0")
+    debug: bool = Field(default=False)
+    environment: str = Field(default="production")
     
     # Server Configuration
-    host: str = Field(default="0.0.0.0", env="HOST")
-    port: int = Field(default=8000, env="PORT")
-    workers: int = Field(default=1, env="WORKERS")
+    host: str = Field(default="0.0.0.0")
+    port: int = Field(default=8000)
+    workers: int = Field(default=1)
     
     # Database Configuration
-    database_url: str = Field(env="DATABASE_URL")
-    database_pool_size: int = Field(default=10, env="DATABASE_POOL_SIZE")
-    database_max_overflow: int = Field(default=20, env="DATABASE_MAX_OVERFLOW")
+    database_url: str = Field(...)
+    database_pool_size: int = Field(default=20)
+    database_max_overflow: int = Field(default=40)
+    database_pool_recycle: int = Field(default=1800)
+    database_pool_pre_ping: bool = Field(default=False)
     
     # Redis Configuration
-    redis_url: str = Field(default="redis://localhost:6379/0", env="REDIS_URL")
-    redis_password: Optional[str] = Field(default=None, env="REDIS_PASSWORD")
+    redis_url: str = Field(default="redis://localhost:6379/0")
+    redis_password: Optional[str] = Field(default=None)
     
     # Fyers API Configuration
-    fyers_app_id: str = Field(env="FYERS_APP_ID")
-    fyers_secret_key: str = Field(env="FYERS_SECRET_KEY")
-    fyers_redirect_uri: str = Field(env="FYERS_REDIRECT_URI")
-    fyers_base_url: str = Field(default="https://api-t1.fyers.in/api/v3", env="FYERS_BASE_URL")
+    fyers_app_id: str = Field(...)
+    fyers_secret_key: str = Field(...)
+    fyers_redirect_uri: str = Field(...)
+    fyers_base_url: str = Field(default="https://api-t1.fyers.in/api/v3")
     
     # JWT Configuration
-    jwt_secret_key: str = Field(env="JWT_SECRET_KEY")
-    jwt_algorithm: str = Field(default="HS256", env="JWT_ALGORITHM")
-    jwt_access_token_expire_minutes: int = Field(default=30, env="JWT_ACCESS_TOKEN_EXPIRE_MINUTES")
-    jwt_refresh_token_expire_days: int = Field(default=7, env="JWT_REFRESH_TOKEN_EXPIRE_DAYS")
+    jwt_secret_key: str = Field(...)
+    jwt_algorithm: str = Field(default="HS256")
+    jwt_access_token_expire_minutes: int = Field(default=30)
+    jwt_refresh_token_expire_days: int = Field(default=7)
     
     # AWS Configuration
-    aws_region: str = Field(default="ap-south-1", env="AWS_REGION")
-    aws_access_key_id: Optional[str] = Field(default=None, env="AWS_ACCESS_KEY_ID")
-    aws_secret_access_key: Optional[str] = Field(default=None, env="AWS_SECRET_ACCESS_KEY")
-    aws_ssm_prefix: str = Field(default="/alogtrader/", env="AWS_SSM_PREFIX")
+    aws_region: str = Field(default="ap-south-1")
+    aws_access_key_id: Optional[str] = Field(default=None)
+    aws_secret_access_key: Optional[str] = Field(default=None)
+    aws_ssm_prefix: str = Field(default="/alogtrader/")
     
     # Chartlink Webhook Configuration
-    chartlink_webhook_secret: str = Field(env="CHARTLINK_WEBHOOK_SECRET")
-    chartlink_webhook_endpoint: str = Field(default="/webhooks/chartlink", env="CHARTLINK_WEBHOOK_ENDPOINT")
+    chartlink_webhook_secret: str = Field(...)
+    chartlink_webhook_endpoint: str = Field(default="/webhooks/chartlink")
+    chartlink_max_body_bytes: int = Field(default=1_048_576)
     
     # Risk Management
-    max_position_size: float = Field(default=100000.0, env="MAX_POSITION_SIZE")
-    max_daily_loss: float = Field(default=5000.0, env="MAX_DAILY_LOSS")
-    max_daily_trades: int = Field(default=50, env="MAX_DAILY_TRADES")
+    max_position_size: float = Field(default=100000.0)
+    max_daily_loss: float = Field(default=5000.0)
+    max_daily_trades: int = Field(default=50)
     
     # Monitoring
-    log_level: str = Field(default="INFO", env="LOG_LEVEL")
-    enable_metrics: bool = Field(default=True, env="ENABLE_METRICS")
-    telegram_bot_token: Optional[str] = Field(default=None, env="TELEGRAM_BOT_TOKEN")
-    telegram_chat_id: Optional[str] = Field(default=None, env="TELEGRAM_CHAT_ID")
+    log_level: str = Field(default="INFO")
+    enable_metrics: bool = Field(default=True)
+    telegram_bot_token: Optional[str] = Field(default=None)
+    telegram_chat_id: Optional[str] = Field(default=None)
     
     # CORS Configuration
-    allowed_origins: List[str] = Field(
-        default=["http://localhost:3000", "http://localhost:8080"],
-        env="ALLOWED_ORIGINS"
-    )
-    allowed_methods: List[str] = Field(
-        default=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-        env="ALLOWED_METHODS"
-    )
-    allowed_headers: List[str] = Field(
-        default=["*"],
-        env="ALLOWED_HEADERS"
-    )
+    allowed_origins: StrTuple = Field(default=("http://localhost:3000", "http://localhost:8080"))
+    allowed_methods: StrTuple = Field(default=("GET", "POST", "PUT", "DELETE", "OPTIONS"))
+    allowed_headers: StrTuple = Field(default=("*",))
     
-    @validator("allowed_origins", "allowed_methods", "allowed_headers", pre=True)
+    @field_validator("allowed_origins", "allowed_methods", "allowed_headers", mode="before")
+    @classmethod
     def parse_list_from_string(cls, v):
-        """Parse comma-separated string into list."""
+        """Parse comma-separated string into an immutable tuple."""
         if isinstance(v, str):
-            return [item.strip() for item in v.split(",")]
+            return tuple(item.strip() for item in v.split(","))
+        if isinstance(v, list):
+            return tuple(v)
         return v
     
-    @validator("environment")
+    @field_validator("environment")
+    @classmethod
     def validate_environment(cls, v):
         """Validate environment setting."""
         allowed_envs = ["development", "staging", "production"]
@@ -96,7 +102,8 @@ class Settings(PydanticBaseSettings):
             raise ValueError(f"Environment must be one of {allowed_envs}")
         return v
     
-    @validator("log_level")
+    @field_validator("log_level")
+    @classmethod
     def validate_log_level(cls, v):
         """Validate log level setting."""
         allowed_levels = ["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"]
@@ -104,62 +111,154 @@ class Settings(PydanticBaseSettings):
             raise ValueError(f"Log level must be one of {allowed_levels}")
         return v.upper()
     
-    class Config:
-        env_file = ".env"
-        env_file_encoding = "utf-8"
-        case_sensitive = False
+    model_config = SettingsConfigDict(
+        env_file=".env",
+        env_file_encoding="utf-8",
+        case_sensitive=False
+    )
 
 
 class AWSConfig:
     """AWS-specific configuration and SSM integration."""
     
-    def __init__(self, settings: Settings):
+    # Shared across instances so botocore loaders are only built once
+    _session = None
+    
+    def __init__(self, settings: Settings, max_age: float = 300.0):
         self.settings = settings
         self._ssm_client = None
+        # Parameter cache keyed by (name, decrypt) -> (fetched_at, value)
+        self._ttl = max_age
+        self._cache: Dict[Tuple[str, bool], Tuple[float, str]] = {}
+        self._locks: Dict[Tuple[str, bool], asyncio.Lock] = {}
     
     @property
     def ssm_client(self):
         """Lazy-loaded SSM client."""
         if self._ssm_client is None:
-            import boto3
-            self._ssm_client = boto3.client(
+            from botocore.config import Config
+            
+            self._ssm_client = self._get_session().client(
                 'ssm',
+                config=Config(
+                    retries={'max_attempts': 3, 'mode': 'adaptive'},
+                    connect_timeout=2,
+                    read_timeout=5
+                )
+            )
+        return self._ssm_client
+    
+    def _get_session(self):
+        """Get the shared boto3 session, creating it on first use."""
+        if AWSConfig._session is None:
+            import boto3
+            AWSConfig._session = boto3.session.Session(
                 region_name=self.settings.aws_region,
                 aws_access_key_id=self.settings.aws_access_key_id,
                 aws_secret_access_key=self.settings.aws_secret_access_key
             )
-        return self._ssm_client
+        return AWSConfig._session
+    
+    def _get_cached(self, key: Tuple[str, bool]) -> Optional[str]:
+        """Return a cached parameter value if it has not expired."""
+        entry = self._cache.get(key)
+        if entry is not None and time.monotonic() - entry[0] < self._ttl:
+            return entry[1]
+        return None
+    
+    def _set_cached(self, key: Tuple[str, bool], value: str):
+        """Store a parameter value in the cache."""
+        self._cache[key] = (time.monotonic(), value)
+    
+    def invalidate(self, parameter_name: Optional[str] = None):
+        """Drop a cached parameter, or the whole cache when no name is given."""
+        if parameter_name is None:
+            self._cache.clear()
+            return
+        for decrypt in (True, False):
+            self._cache.pop((parameter_name, decrypt), None)
     
     async def get_parameter(self, parameter_name: str, decrypt: bool = True) -> str:
         """Get parameter from AWS SSM Parameter Store."""
-        try:
-            response = self.ssm_client.get_parameter(
-                Name=f"{self.settings.aws_ssm_prefix}{parameter_name}",
-                WithDecryption=decrypt
-            )
-            return response['Parameter']['Value']
-        except Exception as e:
-            raise ValueError(f"Failed to get parameter {parameter_name}: {e}")
+        key = (parameter_name, decrypt)
+        value = self._get_cached(key)
+        if value is not None:
+            return value
+        
+        # Coalesce concurrent cold-cache lookups into a single SSM call
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            value = self._get_cached(key)
+            if value is not None:
+                return value
+            try:
+                response = self.ssm_client.get_parameter(
+                    Name=f"{self.settings.aws_ssm_prefix}{parameter_name}",
+                    WithDecryption=decrypt
+                )
+                value = response['Parameter']['Value']
+            except Exception as e:
+                raise ValueError(f"Failed to get parameter {parameter_name}: {e}")
+            self._set_cached(key, value)
+            return value
+    
+    def prefetch_all(self) -> int:
+        """
+        Load every parameter under the SSM prefix into the cache.
+        
+        Uses GetParametersByPath so cold start costs one paginated call
+        instead of one GetParameter round-trip per secret. Blocking; run it
+        in a worker thread from async code.
+        """
+        prefix = self.settings.aws_ssm_prefix
+        paginator = self.ssm_client.get_paginator('get_parameters_by_path')
+        count = 0
+        for page in paginator.paginate(Path=prefix, Recursive=True, WithDecryption=True):
+            for param in page['Parameters']:
+                self._set_cached((param['Name'][len(prefix):], True), param['Value'])
+                count += 1
+        return count
     
     async def get_parameters(self, parameter_names: List[str], decrypt: bool = True) -> dict:
         """Get multiple parameters from AWS SSM Parameter Store."""
+        result = {}
+        missing = []
+        for name in parameter_names:
+            value = self._get_cached((name, decrypt))
+            if value is not None:
+                result[name] = value
+            else:
+                missing.append(name)
+        
+        prefix = self.settings.aws_ssm_prefix
         try:
-            names = [f"{self.settings.aws_ssm_prefix}{name}" for name in parameter_names]
-            response = self.ssm_client.get_parameters(
-                Names=names,
-                WithDecryption=decrypt
-            )
-            return {
-                param['Name'].replace(self.settings.aws_ssm_prefix, ''): param['Value']
-                for param in response['Parameters']
-            }
+            # GetParameters accepts at most 10 names per call
+            for i in range(0, len(missing), 10):
+                response = self.ssm_client.get_parameters(
+                    Names=[f"{prefix}{name}" for name in missing[i:i + 10]],
+                    WithDecryption=decrypt
+                )
+                for param in response['Parameters']:
+                    name = param['Name'][len(prefix):]
+                    self._set_cached((name, decrypt), param['Value'])
+                    result[name] = param['Value']
         except Exception as e:
             raise ValueError(f"Failed to get parameters {parameter_names}: {e}")
+        
+        return result
+
+
+# Environment variable used to hand validated settings to worker processes
+SETTINGS_BLOB_ENV = "_SETTINGS_BLOB"
 
 
 @lru_cache()
 def get_settings() -> Settings:
     """Get cached application settings."""
+    # Workers spawned by the parent process reuse its already-validated values
+    blob = os.environ.get(SETTINGS_BLOB_ENV)
+    if blob:
+        return Settings.model_construct(**json.loads(blob))
     return Settings()
 
 
@@ -171,4 +270,3 @@ def get_aws_config() -> AWSConfig:
 
 # Export commonly used settings
 settings = get_settings()
-aws_config = get_aws_config()
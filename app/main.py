@@ -3,22 +3,40 @@ Main FastAPI application entry point.
 """
 
 import asyncio
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 from contextlib import asynccontextmanager
 from typing import AsyncGenerator
 
 from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 from loguru import logger
 import time
 
-from app.config import settings
+from app.config import settings, get_aws_config
 from app.db import init_db, close_db
 from app.redis_client import redis_client
+from app.services.fyers_client import close_shared_client, close_token_clients
 from app.services.trade_engine import trade_engine
+from app.workers import start_consumers
 from app.routers import auth, chartlink, fyers, strategy, portfolio, health
 
+# Hand log records to a background writer thread so handlers never block on
+# stderr; production emits structured JSON instead of formatted text.
+logger.remove()
+logger.add(
+    sys.stderr,
+    level=settings.log_level,
+    enqueue=True,
+    backtrace=False,
+    diagnose=False,
+    serialize=settings.environment == "production"
+)
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
@@ -26,7 +44,20 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
     # Startup
     logger.info("Starting AlgoTrader application...")
     
+    # Size the default executor (password hashing, SSM calls) to the available cores
+    asyncio.get_running_loop().set_default_executor(
+        ThreadPoolExecutor(max_workers=min(32, (os.cpu_count() or 1) * 2))
+    )
+    
     try:
+        # Warm the SSM parameter cache in one batched call
+        if settings.environment == "production":
+            try:
+                count = await asyncio.to_thread(get_aws_config().prefetch_all)
+                logger.info(f"Prefetched {count} SSM parameters")
+            except Exception as e:
+                logger.warning(f"SSM parameter prefetch failed: {e}")
+        
         # Initialize database
         await init_db()
         logger.info("Database initialized successfully")
@@ -35,9 +66,12 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
         await redis_client.connect()
         logger.info("Redis connected successfully")
         
-        # Start background tasks
-        asyncio.create_task(background_task_processor())
-        logger.info("Background task processor started")
+        # Queue consumers normally run as a separate process (app.workers);
+        # single-process debug runs keep them in-process for convenience
+        consumers = []
+        if settings.debug and settings.workers == 1:
+            consumers = start_consumers()
+            logger.info("Background task consumers started")
         
         logger.info("Application startup completed successfully")
         
@@ -50,10 +84,15 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
     # Shutdown
     logger.info("Shutting down AlgoTrader application...")
     
+    for consumer in consumers:
+        consumer.cancel()
+    
     try:
-        # Close trade engine clients
+        # Close trade engine, shared and per-token Fyers clients
         await trade_engine.close_all_clients()
-        logger.info("Trade engine clients closed")
+        await close_shared_client()
+        await close_token_clients()
+        logger.info("Fyers clients closed")
         
         # Disconnect from Redis
         await redis_client.disconnect()
@@ -67,6 +106,9 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
         
     except Exception as e:
         logger.error(f"Application shutdown error: {e}")
+    
+    # Flush any records still queued for the log writer
+    await logger.complete()
 
 
 # Create FastAPI application
@@ -76,6 +118,7 @@ app = FastAPI(
     description="Comprehensive Algorithmic Trading Platform",
     docs_url="/docs" if settings.debug else None,
     redoc_url="/redoc" if settings.debug else None,
+    default_response_class=ORJSONResponse,
     lifespan=lifespan
 )
 
@@ -99,11 +142,13 @@ if settings.environment == "production":
 # Request timing middleware
 @app.middleware("http")
 async def add_process_time_header(request: Request, call_next):
-    """Add processing time to response headers."""
-    start_time = time.time()
+    """Add processing time (integer microseconds) to response headers."""
+    start_ns = time.perf_counter_ns()
     response = await call_next(request)
-    process_time = time.time() - start_time
-    response.headers["X-Process-Time"] = str(process_time)
+    end_ns = time.perf_counter_ns()
+    # Always in debug; otherwise sample ~1 in 64 responses via the clock's low bits
+    if settings.debug or (end_ns & 0x3F) == 0:
+        response.headers["X-Process-Time-Us"] = str((end_ns - start_ns) // 1000)
     return response
 
 
@@ -112,12 +157,12 @@ async def add_process_time_header(request: Request, call_next):
 async def global_exception_handler(request: Request, exc: Exception):
     """Global exception handler."""
     logger.error(f"Unhandled exception: {exc}", exc_info=True)
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=500,
         content={
             "error": "Internal server error",
             "message": "An unexpected error occurred",
-            "timestamp": time.time()
+            "timestamp": datetime.utcnow().isoformat()
         }
     )
 
@@ -143,75 +188,24 @@ async def root():
     }
 
 
-# Background task processor
-async def background_task_processor():
-    """Background task processor for handling queued tasks."""
-    logger.info("Background task processor started")
-    
-    while True:
-        try:
-            # Process trade execution tasks
-            task = await redis_client.dequeue_task("trade_execution", timeout=1)
-            if task:
-                await process_trade_task(task)
-            
-            # Process alert processing tasks
-            task = await redis_client.dequeue_task("alert_processing", timeout=1)
-            if task:
-                await process_alert_task(task)
-            
-            # Small delay to prevent busy waiting
-            await asyncio.sleep(0.1)
-            
-        except Exception as e:
-            logger.error(f"Error in background task processor: {e}")
-            await asyncio.sleep(1)
-
-
-async def process_trade_task(task_data: dict):
-    """Process a trade execution task."""
-    try:
-        from app.db import AsyncSessionLocal
-        
-        async with AsyncSessionLocal() as db:
-            trade_id = task_data["data"]["trade_id"]
-            success = await trade_engine.update_trade_status(trade_id, db)
-            
-            if success:
-                logger.info(f"Successfully processed trade task: {trade_id}")
-            else:
-                logger.warning(f"Failed to process trade task: {trade_id}")
-                
-    except Exception as e:
-        logger.error(f"Error processing trade task: {e}")
-
-
-async def process_alert_task(task_data: dict):
-    """Process an alert processing task."""
-    try:
-        from app.db import AsyncSessionLocal
-        
-        async with AsyncSessionLocal() as db:
-            alert_id = task_data["data"]["alert_id"]
-            success = await trade_engine.process_alert(alert_id, db)
-            
-            if success:
-                logger.info(f"Successfully processed alert task: {alert_id}")
-            else:
-                logger.warning(f"Failed to process alert task: {alert_id}")
-                
-    except Exception as e:
-        logger.error(f"Error processing alert task: {e}")
-
-
 if __name__ == "__main__":
     import uvicorn
     
+    from app.config import SETTINGS_BLOB_ENV
+    
+    # Let worker processes skip re-reading and re-validating settings.
+    # Not used with reload so .env edits are picked up on restart.
+    if not settings.debug:
+        os.environ[SETTINGS_BLOB_ENV] = settings.model_dump_json()
+    
     uvicorn.run(
         "app.main:app",
         host=settings.host,
         port=settings.port,
         reload=settings.debug,
         workers=settings.workers if not settings.debug else 1,
-        log_level=settings.log_level.lower()
+        log_level=settings.log_level.lower(),
+        loop="uvloop",
+        http="httptools",
+        access_log=False
     )
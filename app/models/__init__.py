@@ -7,6 +7,7 @@ from app.models.strategy import Strategy
 from app.models.trade import Trade, TradeStatus, OrderType, OrderSide
 from app.models.alert import Alert, AlertStatus, AlertType, AlertSource
 from app.models.portfolio import Portfolio
+from app.models.scan_batch import ScanBatch
 
 __all__ = [
     "User",
@@ -19,5 +20,6 @@ __all__ = [
     "AlertStatus",
     "AlertType",
     "AlertSource",
-    "Portfolio"
+    "Portfolio",
+    "ScanBatch"
 ]
@@ -4,9 +4,10 @@ Alert model for external trading signals and notifications.
 
 from datetime import datetime
 from typing import Optional, Dict, Any
-from sqlalchemy import String, Boolean, DateTime, Text, ForeignKey, Float, Integer, JSON, Enum
+from sqlalchemy import String, Boolean, DateTime, Text, ForeignKey, Float, Integer, Enum, Index, text, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.dialects.postgresql import JSONB, UUID
 import uuid
 import enum
 
@@ -43,6 +44,13 @@ class Alert(Base):
     """Alert model for external trading signals and notifications."""
     
     __tablename__ = "alerts"
+    __table_args__ = (
+        Index("ix_alerts_metadata_gin", "metadata", postgresql_using="gin"),
+        Index("ix_alerts_user_symbol", "user_id", "symbol"),
+        Index("ix_alerts_pending", "created_at", postgresql_where=text("status = 'RECEIVED'")),
+        # Webhook retries reuse the external id, so each user gets at most one row per fire
+        Index("ix_alerts_external_user", "external_id", "user_id", unique=True),
+    )
     
     # Primary key
     id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
@@ -60,7 +68,8 @@ class Alert(Base):
     price: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
     quantity: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
     message: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
-    metadata: Mapped[Dict[str, Any]] = mapped_column(JSON, nullable=False, default=dict)
+    # Attribute is renamed because "metadata" is reserved on declarative classes
+    extra_metadata: Mapped[Dict[str, Any]] = mapped_column("metadata", JSONB, nullable=False, default=dict)
     
     # Processing information
     status: Mapped[AlertStatus] = mapped_column(Enum(AlertStatus), default=AlertStatus.RECEIVED, nullable=False)
@@ -72,7 +81,7 @@ class Alert(Base):
     confidence_score: Mapped[Optional[float]] = mapped_column(Float, nullable=True)  # 0.0 to 1.0
     
     # External reference
-    external_id: Mapped[Optional[str]] = mapped_column(String(100), nullable=True, index=True)
+    external_id: Mapped[Optional[str]] = mapped_column(String(100), nullable=True)
     external_source: Mapped[Optional[str]] = mapped_column(String(100), nullable=True)
     
     # Timestamps
@@ -80,9 +89,9 @@ class Alert(Base):
     updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
     
     # Relationships
-    user = relationship("User", back_populates="alerts")
-    matched_strategy = relationship("Strategy", foreign_keys=[matched_strategy_id])
-    trades = relationship("Trade", back_populates="alert", cascade="all, delete-orphan")
+    user = relationship("User", back_populates="alerts", lazy="raise")
+    matched_strategy = relationship("Strategy", foreign_keys=[matched_strategy_id], lazy="raise")
+    trades = relationship("Trade", back_populates="alert", cascade="all, delete-orphan", lazy="raise")
     
     def __repr__(self) -> str:
         return f"<Alert(id={self.id}, symbol={self.symbol}, type={self.alert_type}, status={self.status})>"
@@ -100,7 +109,6 @@ class Alert(Base):
     def mark_as_processing(self):
         """Mark alert as being processed."""
         self.status = AlertStatus.PROCESSING
-        self.updated_at = datetime.utcnow()
     
     def mark_as_processed(self, strategy_id: Optional[uuid.UUID] = None, confidence: Optional[float] = None):
         """Mark alert as successfully processed."""
@@ -110,21 +118,48 @@ class Alert(Base):
             self.matched_strategy_id = strategy_id
         if confidence is not None:
             self.confidence_score = confidence
-        self.updated_at = datetime.utcnow()
     
     def mark_as_failed(self, error_message: str):
         """Mark alert as failed processing."""
         self.status = AlertStatus.FAILED
         self.error_message = error_message
         self.processed_at = datetime.utcnow()
-        self.updated_at = datetime.utcnow()
     
     def mark_as_ignored(self, reason: str = "No matching strategy found"):
         """Mark alert as ignored."""
         self.status = AlertStatus.IGNORED
         self.error_message = reason
         self.processed_at = datetime.utcnow()
-        self.updated_at = datetime.utcnow()
+    
+    @classmethod
+    async def set_status(
+        cls,
+        db: AsyncSession,
+        alert_id: uuid.UUID,
+        status: AlertStatus,
+        error_message: Optional[str] = None
+    ) -> bool:
+        """
+        Update an alert's status with a single UPDATE ... RETURNING.
+        
+        Avoids loading and hydrating the row when only the status changes.
+        Returns False if no alert with that id exists.
+        """
+        values: Dict[str, Any] = {"status": status}
+        if status in (AlertStatus.PROCESSED, AlertStatus.FAILED, AlertStatus.IGNORED):
+            values["processed_at"] = datetime.utcnow()
+        if error_message is not None:
+            values["error_message"] = error_message
+        
+        stmt = (
+            update(cls)
+            .where(cls.id == alert_id)
+            .values(**values)
+            .returning(cls.id)
+            .execution_options(synchronize_session=False)
+        )
+        result = await db.execute(stmt)
+        return result.scalar_one_or_none() is not None
     
     def to_trade_signal(self) -> Dict[str, Any]:
         """Convert alert to trade signal format."""
@@ -135,7 +170,7 @@ class Alert(Base):
             "price": self.price,
             "quantity": self.quantity,
             "message": self.message,
-            "metadata": self.metadata,
+            "metadata": self.extra_metadata,
             "confidence": self.confidence_score,
             "source": self.source.value
         }
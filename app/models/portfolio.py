@@ -4,9 +4,11 @@ Portfolio model for position tracking and portfolio management.
 
 from datetime import datetime
 from typing import Optional, Dict, Any
-from sqlalchemy import String, Boolean, DateTime, Text, ForeignKey, Float, Integer, JSON
+from sqlalchemy import String, Boolean, DateTime, Text, ForeignKey, Float, Integer, Index, UniqueConstraint, Computed, and_, case, column, func, or_, text, update, values
+from sqlalchemy.ext.hybrid import hybrid_method, hybrid_property
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.dialects.postgresql import JSONB, UUID
 import uuid
 
 from app.db import Base
@@ -16,6 +18,15 @@ class Portfolio(Base):
     """Portfolio model for position tracking and portfolio management."""
     
     __tablename__ = "portfolios"
+    __table_args__ = (
+        Index("ix_portfolios_metadata_gin", "metadata", postgresql_using="gin"),
+        UniqueConstraint("user_id", "symbol", "exchange", name="uq_portfolio_user_symbol"),
+        Index("ix_portfolio_user_open", "user_id", postgresql_where=text("quantity <> 0")),
+        Index("ix_portfolio_stop_loss", "stop_loss_price", postgresql_where=text("stop_loss_price IS NOT NULL")),
+        Index("ix_portfolio_take_profit", "take_profit_price", postgresql_where=text("take_profit_price IS NOT NULL")),
+    )
+    # Fetch the generated total_pnl back via RETURNING after each flush
+    __mapper_args__ = {"eager_defaults": True}
     
     # Primary key
     id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
@@ -35,7 +46,9 @@ class Portfolio(Base):
     # P&L calculations
     unrealized_pnl: Mapped[float] = mapped_column(Float, default=0.0, nullable=False)
     realized_pnl: Mapped[float] = mapped_column(Float, default=0.0, nullable=False)
-    total_pnl: Mapped[float] = mapped_column(Float, default=0.0, nullable=False)
+    total_pnl: Mapped[float] = mapped_column(
+        Float, Computed("realized_pnl + unrealized_pnl", persisted=True), nullable=False
+    )
     
     # Position value
     market_value: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
@@ -52,7 +65,8 @@ class Portfolio(Base):
     trade_count: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
     
     # Additional data
-    metadata: Mapped[Dict[str, Any]] = mapped_column(JSON, nullable=False, default=dict)
+    # Attribute is renamed because "metadata" is reserved on declarative classes
+    extra_metadata: Mapped[Dict[str, Any]] = mapped_column("metadata", JSONB, nullable=False, default=dict)
     notes: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
     
     # Timestamps
@@ -60,7 +74,7 @@ class Portfolio(Base):
     updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
     
     # Relationships
-    user = relationship("User")
+    user = relationship("User", lazy="raise")
     
     def __repr__(self) -> str:
         return f"<Portfolio(id={self.id}, symbol={self.symbol}, quantity={self.quantity})>"
@@ -87,35 +101,38 @@ class Portfolio(Base):
             return 0.0
         return abs(self.quantity) * self.current_price
     
-    @property
+    @hybrid_property
     def pnl_percentage(self) -> float:
         """Calculate P&L percentage."""
         if self.invested_amount is None or self.invested_amount == 0:
             return 0.0
         return (self.total_pnl / self.invested_amount) * 100
     
+    @pnl_percentage.expression
+    def pnl_percentage(cls):
+        """SQL expression for P&L percentage, usable in queries and aggregates."""
+        return case(
+            (func.coalesce(cls.invested_amount, 0) == 0, 0.0),
+            else_=(cls.total_pnl / cls.invested_amount) * 100
+        )
+    
     def update_position(self, trade_quantity: int, trade_price: float, trade_date: datetime):
         """Update position based on a new trade."""
         old_quantity = self.quantity
-        old_average_price = self.average_price
+        old_average_price = self.average_price or 0.0
+        new_quantity = old_quantity + trade_quantity
+        self.quantity = new_quantity
         
-        # Update quantity
-        self.quantity += trade_quantity
-        
-        # Update average price
-        if self.quantity == 0:
+        # Update average price and invested amount
+        if new_quantity == 0:
             self.average_price = None
             self.invested_amount = 0.0
-        elif old_quantity == 0:
-            self.average_price = trade_price
-            self.invested_amount = abs(self.quantity) * trade_price
         else:
-            # Calculate new average price
-            old_value = old_quantity * (old_average_price or 0)
-            new_value = trade_quantity * trade_price
-            total_value = old_value + new_value
-            self.average_price = total_value / self.quantity
-            self.invested_amount = abs(self.quantity) * self.average_price
+            if old_quantity:
+                self.average_price = (old_quantity * old_average_price + trade_quantity * trade_price) / new_quantity
+            else:
+                self.average_price = trade_price
+            self.invested_amount = abs(new_quantity) * self.average_price
         
         # Update trade count and dates
         self.trade_count += 1
@@ -123,18 +140,10 @@ class Portfolio(Base):
             self.first_trade_date = trade_date
         self.last_trade_date = trade_date
         
-        # Calculate realized P&L if position is reduced or closed
-        if abs(self.quantity) < abs(old_quantity):
-            if old_quantity > 0 and trade_quantity < 0:  # Reducing long position
-                realized_pnl = (trade_price - (old_average_price or 0)) * abs(trade_quantity)
-            elif old_quantity < 0 and trade_quantity > 0:  # Reducing short position
-                realized_pnl = ((old_average_price or 0) - trade_price) * abs(trade_quantity)
-            else:
-                realized_pnl = 0.0
-            
-            self.realized_pnl += realized_pnl
-        
-        self.updated_at = datetime.utcnow()
+        # Realize P&L if position is reduced or closed. A reduction always trades
+        # against the existing side, so one expression covers longs and shorts.
+        if abs(new_quantity) < abs(old_quantity):
+            self.realized_pnl += (trade_price - old_average_price) * -trade_quantity
     
     def update_current_price(self, current_price: float):
         """Update current price and recalculate unrealized P&L."""
@@ -147,20 +156,61 @@ class Portfolio(Base):
                 self.unrealized_pnl = (self.average_price - current_price) * abs(self.quantity)
             
             self.market_value = abs(self.quantity) * current_price
-            self.total_pnl = self.realized_pnl + self.unrealized_pnl
+    
+    @classmethod
+    async def bulk_update_prices(
+        cls,
+        db: AsyncSession,
+        prices: Dict[str, float],
+        user_id: Optional[uuid.UUID] = None
+    ) -> int:
+        """
+        Mark positions to market for many symbols in a single UPDATE.
+        
+        Mirrors update_current_price in SQL by joining against a VALUES list
+        of (symbol, price). Returns the number of rows updated.
+        """
+        if not prices:
+            return 0
+        
+        v = values(
+            column("symbol", String), column("price", Float), name="v"
+        ).data(list(prices.items()))
         
-        self.updated_at = datetime.utcnow()
+        has_position = and_(cls.quantity != 0, cls.average_price.isnot(None))
+        stmt = (
+            update(cls)
+            .where(cls.symbol == v.c.symbol)
+            .values(
+                current_price=v.c.price,
+                unrealized_pnl=case(
+                    (and_(has_position, cls.quantity > 0), (v.c.price - cls.average_price) * cls.quantity),
+                    (has_position, (cls.average_price - v.c.price) * -cls.quantity),
+                    else_=cls.unrealized_pnl
+                ),
+                market_value=case(
+                    (has_position, func.abs(cls.quantity) * v.c.price),
+                    else_=cls.market_value
+                ),
+                updated_at=datetime.utcnow()
+            )
+            .execution_options(synchronize_session=False)
+        )
+        if user_id is not None:
+            stmt = stmt.where(cls.user_id == user_id)
+        
+        result = await db.execute(stmt)
+        return result.rowcount
     
     def set_stop_loss(self, stop_loss_price: float):
         """Set stop loss price for the position."""
         self.stop_loss_price = stop_loss_price
-        self.updated_at = datetime.utcnow()
     
     def set_take_profit(self, take_profit_price: float):
         """Set take profit price for the position."""
         self.take_profit_price = take_profit_price
-        self.updated_at = datetime.utcnow()
     
+    @hybrid_method
     def is_stop_loss_triggered(self) -> bool:
         """Check if stop loss is triggered."""
         if self.stop_loss_price is None or self.current_price is None:
@@ -171,6 +221,19 @@ class Portfolio(Base):
         else:  # Short position
             return self.current_price >= self.stop_loss_price
     
+    @is_stop_loss_triggered.expression
+    def is_stop_loss_triggered(cls):
+        """SQL predicate for stop loss, e.g. select(Portfolio).where(Portfolio.is_stop_loss_triggered())."""
+        return and_(
+            cls.stop_loss_price.isnot(None),
+            cls.current_price.isnot(None),
+            or_(
+                and_(cls.quantity > 0, cls.current_price <= cls.stop_loss_price),
+                and_(cls.quantity <= 0, cls.current_price >= cls.stop_loss_price)
+            )
+        )
+    
+    @hybrid_method
     def is_take_profit_triggered(self) -> bool:
         """Check if take profit is triggered."""
         if self.take_profit_price is None or self.current_price is None:
@@ -180,3 +243,15 @@ class Portfolio(Base):
             return self.current_price >= self.take_profit_price
         else:  # Short position
             return self.current_price <= self.take_profit_price
+    
+    @is_take_profit_triggered.expression
+    def is_take_profit_triggered(cls):
+        """SQL predicate for take profit, usable in bulk position scans."""
+        return and_(
+            cls.take_profit_price.isnot(None),
+            cls.current_price.isnot(None),
+            or_(
+                and_(cls.quantity > 0, cls.current_price >= cls.take_profit_price),
+                and_(cls.quantity <= 0, cls.current_price <= cls.take_profit_price)
+            )
+        )
@@ -0,0 +1,38 @@
+"""
+Chartlink scan payloads, stored once per scan fire.
+"""
+
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from sqlalchemy import DateTime, Integer, String
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.dialects.postgresql import JSONB, UUID
+import uuid
+from uuid_utils.compat import uuid7
+
+from app.db import Base
+
+
+class ScanBatch(Base):
+    """One Chartlink scan fire; per-user scan alerts reference it by id."""
+    
+    __tablename__ = "scan_batches"
+    
+    # Primary key
+    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid7)
+    
+    # Scan information
+    external_id: Mapped[str] = mapped_column(String(100), nullable=False, index=True)
+    scan_name: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
+    triggered_at: Mapped[Optional[str]] = mapped_column(String(100), nullable=True)
+    stocks_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    
+    # Parsed stocks and the original webhook body
+    stocks: Mapped[List[Dict[str, Any]]] = mapped_column(JSONB, nullable=False, default=list)
+    raw_payload: Mapped[Dict[str, Any]] = mapped_column(JSONB, nullable=False, default=dict)
+    
+    # Timestamps
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+    
+    def __repr__(self) -> str:
+        return f"<ScanBatch(id={self.id}, scan_name={self.scan_name}, stocks_count={self.stocks_count})>"
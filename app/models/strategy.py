@@ -3,11 +3,12 @@ Strategy model for trading strategy management.
 """
 
 from datetime import datetime
-from typing import Optional, Dict, Any
-from sqlalchemy import String, Boolean, DateTime, Text, ForeignKey, Float, Integer, JSON
-from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy.dialects.postgresql import UUID
+from typing import Callable, Optional, Dict, Any
+from sqlalchemy import String, Boolean, DateTime, Text, ForeignKey, Float, Integer, Index, event
+from sqlalchemy.orm import Mapped, mapped_column, relationship, validates
+from sqlalchemy.dialects.postgresql import JSONB, UUID
 import uuid
+from uuid_utils.compat import uuid7
 
 from app.db import Base
 
@@ -16,9 +17,16 @@ class Strategy(Base):
     """Trading strategy model for strategy management and execution."""
     
     __tablename__ = "strategies"
+    __table_args__ = (
+        # jsonb_path_ops serves @> containment lookups with a smaller index
+        Index("ix_strategies_parameters_gin", "parameters", postgresql_using="gin",
+              postgresql_ops={"parameters": "jsonb_path_ops"}),
+        Index("ix_strategies_entry_rules_gin", "entry_rules", postgresql_using="gin",
+              postgresql_ops={"entry_rules": "jsonb_path_ops"}),
+    )
     
     # Primary key
-    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid7)
     
     # Foreign key
     user_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
@@ -29,13 +37,13 @@ class Strategy(Base):
     strategy_type: Mapped[str] = mapped_column(String(100), nullable=False)  # momentum, mean_reversion, breakout, etc.
     
     # Strategy configuration
-    parameters: Mapped[Dict[str, Any]] = mapped_column(JSON, nullable=False, default=dict)
-    risk_parameters: Mapped[Dict[str, Any]] = mapped_column(JSON, nullable=False, default=dict)
+    parameters: Mapped[Dict[str, Any]] = mapped_column(JSONB, nullable=False, default=dict)
+    risk_parameters: Mapped[Dict[str, Any]] = mapped_column(JSONB, nullable=False, default=dict)
     
     # Trading rules
-    entry_rules: Mapped[Dict[str, Any]] = mapped_column(JSON, nullable=False, default=dict)
-    exit_rules: Mapped[Dict[str, Any]] = mapped_column(JSON, nullable=False, default=dict)
-    position_sizing_rules: Mapped[Dict[str, Any]] = mapped_column(JSON, nullable=False, default=dict)
+    entry_rules: Mapped[Dict[str, Any]] = mapped_column(JSONB, nullable=False, default=dict)
+    exit_rules: Mapped[Dict[str, Any]] = mapped_column(JSONB, nullable=False, default=dict)
+    position_sizing_rules: Mapped[Dict[str, Any]] = mapped_column(JSONB, nullable=False, default=dict)
     
     # Risk management
     max_position_size: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
@@ -53,6 +61,7 @@ class Strategy(Base):
     losing_trades: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
     total_pnl: Mapped[float] = mapped_column(Float, default=0.0, nullable=False)
     max_drawdown: Mapped[float] = mapped_column(Float, default=0.0, nullable=False)
+    win_rate_bp: Mapped[int] = mapped_column(Integer, default=0, nullable=False)  # Basis points, kept in step with the counters
     sharpe_ratio: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
     
     # Timestamps
@@ -61,18 +70,20 @@ class Strategy(Base):
     last_executed_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
     
     # Relationships
-    user = relationship("User", back_populates="strategies")
-    trades = relationship("Trade", back_populates="strategy", cascade="all, delete-orphan")
+    user = relationship("User", back_populates="strategies", lazy="raise")
+    trades = relationship("Trade", back_populates="strategy", cascade="all, delete-orphan", lazy="raise")
     
     def __repr__(self) -> str:
         return f"<Strategy(id={self.id}, name={self.name}, type={self.strategy_type})>"
     
     @property
     def win_rate(self) -> float:
-        """Calculate win rate percentage."""
-        if self.total_trades == 0:
-            return 0.0
-        return (self.winning_trades / self.total_trades) * 100
+        """Win rate percentage."""
+        return self.win_rate_bp / 100.0
+    
+    def refresh_win_rate(self):
+        """Recompute the stored win rate after the trade counters change."""
+        self.win_rate_bp = self.winning_trades * 10000 // self.total_trades if self.total_trades else 0
     
     @property
     def loss_rate(self) -> float:
@@ -90,6 +101,7 @@ class Strategy(Base):
             self.winning_trades += 1
         else:
             self.losing_trades += 1
+        self.refresh_win_rate()
         
         # Update max drawdown if current PnL is negative
         if self.total_pnl < 0 and abs(self.total_pnl) > self.max_drawdown:
@@ -97,10 +109,29 @@ class Strategy(Base):
         
         self.last_executed_at = datetime.utcnow()
     
+    def _compile_risk_check(self) -> Callable[[float, int], bool]:
+        """Bind the risk thresholds once; unset (or zero) limits never trigger."""
+        max_position_size = self.max_position_size or float("inf")
+        max_daily_trades = self.max_daily_trades or float("inf")
+        return lambda position_size, daily_trades: (
+            position_size > max_position_size or daily_trades >= max_daily_trades
+        )
+    
+    @validates("max_position_size", "max_daily_trades")
+    def _reset_risk_check(self, key: str, value):
+        """Drop the compiled risk check when a limit changes."""
+        self._risk_check = None
+        return value
+    
     def is_risk_limits_exceeded(self, current_position_size: float, daily_trades: int) -> bool:
         """Check if strategy risk limits are exceeded."""
-        if self.max_position_size and current_position_size > self.max_position_size:
-            return True
-        if self.max_daily_trades and daily_trades >= self.max_daily_trades:
-            return True
-        return False
+        check = getattr(self, "_risk_check", None)
+        if check is None:
+            check = self._risk_check = self._compile_risk_check()
+        return check(current_position_size, daily_trades)
+
+
+@event.listens_for(Strategy, "refresh")
+def _reset_risk_check_on_refresh(target: Strategy, context, attrs):
+    """Limits reloaded from the database bypass validators, so recompile lazily."""
+    target._risk_check = None
@@ -3,11 +3,13 @@ Trade model for order execution and trade tracking.
 """
 
 from datetime import datetime
-from typing import Optional
-from sqlalchemy import String, Boolean, DateTime, Text, ForeignKey, Float, Integer, Enum
+from typing import Mapping, Optional, Sequence
+import numpy as np
+from sqlalchemy import String, Boolean, DateTime, Text, ForeignKey, Float, Integer, Enum, Index, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.dialects.postgresql import UUID
 import uuid
+from uuid_utils.compat import uuid7
 import enum
 
 from app.db import Base
@@ -24,6 +26,21 @@ class TradeStatus(str, enum.Enum):
     FAILED = "failed"
 
 
+# Status bit flags for cheap set-membership tests
+_FILLED, _PARTIAL, _PENDING, _SUBMITTED, _CANCELLED, _REJECTED, _FAILED = (1 << i for i in range(7))
+_STATUS_FLAGS = {
+    TradeStatus.FILLED: _FILLED,
+    TradeStatus.PARTIALLY_FILLED: _PARTIAL,
+    TradeStatus.PENDING: _PENDING,
+    TradeStatus.SUBMITTED: _SUBMITTED,
+    TradeStatus.CANCELLED: _CANCELLED,
+    TradeStatus.REJECTED: _REJECTED,
+    TradeStatus.FAILED: _FAILED,
+}
+_OPEN_MASK = _PENDING | _SUBMITTED
+_CLOSED_MASK = _CANCELLED | _REJECTED | _FAILED
+
+
 class OrderType(str, enum.Enum):
     """Order type enumeration."""
     MARKET = "market"
@@ -38,13 +55,38 @@ class OrderSide(str, enum.Enum):
     SELL = "sell"
 
 
+def _string_enum(enum_cls: type, name: str) -> Enum:
+    """VARCHAR(16) + CHECK storing enum values, avoiding Postgres enum types on the write path."""
+    return Enum(
+        enum_cls,
+        name=name,
+        native_enum=False,
+        create_constraint=True,
+        length=16,
+        validate_strings=True,
+        values_callable=lambda members: [member.value for member in members],
+    )
+
+
 class Trade(Base):
     """Trade model for order execution and trade tracking."""
     
     __tablename__ = "trades"
+    __table_args__ = (
+        Index("ix_trades_user_created", "user_id", "created_at"),
+        Index("ix_trades_user_open", "user_id", "created_at",
+              postgresql_where=text("status IN ('pending', 'submitted', 'partially_filled')")),
+        Index("ix_trades_strategy_created", "strategy_id", "created_at"),
+        Index("ix_trades_strategy_filled", "strategy_id", "filled_at", postgresql_where=text("status = 'filled'")),
+        Index("ix_trades_symbol_created", "symbol", "created_at"),
+        Index("ix_trades_created_brin", "created_at", postgresql_using="brin",
+              postgresql_with={"pages_per_range": 32}),
+        Index("ix_trades_fyers_order_id", "fyers_order_id", unique=True,
+              postgresql_where=text("fyers_order_id IS NOT NULL")),
+    )
     
     # Primary key
-    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid7)
     
     # Foreign keys
     user_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
@@ -52,10 +94,10 @@ class Trade(Base):
     alert_id: Mapped[Optional[uuid.UUID]] = mapped_column(UUID(as_uuid=True), ForeignKey("alerts.id"), nullable=True)
     
     # Trade information
-    symbol: Mapped[str] = mapped_column(String(50), nullable=False, index=True)
+    symbol: Mapped[str] = mapped_column(String(50), nullable=False)
     exchange: Mapped[str] = mapped_column(String(20), nullable=False)
-    side: Mapped[OrderSide] = mapped_column(Enum(OrderSide), nullable=False)
-    order_type: Mapped[OrderType] = mapped_column(Enum(OrderType), nullable=False)
+    side: Mapped[OrderSide] = mapped_column(_string_enum(OrderSide, "order_side"), nullable=False)
+    order_type: Mapped[OrderType] = mapped_column(_string_enum(OrderType, "order_type"), nullable=False)
     
     # Order details
     quantity: Mapped[int] = mapped_column(Integer, nullable=False)
@@ -68,12 +110,12 @@ class Trade(Base):
     total_amount: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
     
     # Fyers API details
-    fyers_order_id: Mapped[Optional[str]] = mapped_column(String(100), nullable=True, index=True)
+    fyers_order_id: Mapped[Optional[str]] = mapped_column(String(100), nullable=True)
     fyers_status: Mapped[Optional[str]] = mapped_column(String(50), nullable=True)
     fyers_message: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
     
     # Trade status and timing
-    status: Mapped[TradeStatus] = mapped_column(Enum(TradeStatus), default=TradeStatus.PENDING, nullable=False)
+    status: Mapped[TradeStatus] = mapped_column(_string_enum(TradeStatus, "trade_status"), default=TradeStatus.PENDING, nullable=False)
     submitted_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
     filled_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
     cancelled_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
@@ -97,9 +139,9 @@ class Trade(Base):
     updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
     
     # Relationships
-    user = relationship("User", back_populates="trades")
-    strategy = relationship("Strategy", back_populates="trades")
-    alert = relationship("Alert", back_populates="trades")
+    user = relationship("User", back_populates="trades", lazy="raise")
+    strategy = relationship("Strategy", back_populates="trades", lazy="raise")
+    alert = relationship("Alert", back_populates="trades", lazy="raise")
     
     def __repr__(self) -> str:
         return f"<Trade(id={self.id}, symbol={self.symbol}, side={self.side}, status={self.status})>"
@@ -116,15 +158,20 @@ class Trade(Base):
             self.status == TradeStatus.FILLED and self.filled_quantity < self.quantity
         )
     
+    @property
+    def status_flags(self) -> int:
+        """Bit flag for the current status."""
+        return _STATUS_FLAGS.get(self.status, 0)
+    
     @property
     def is_pending(self) -> bool:
         """Check if trade is still pending."""
-        return self.status in [TradeStatus.PENDING, TradeStatus.SUBMITTED]
+        return bool(_STATUS_FLAGS.get(self.status, 0) & _OPEN_MASK)
     
     @property
     def is_cancelled(self) -> bool:
         """Check if trade is cancelled."""
-        return self.status in [TradeStatus.CANCELLED, TradeStatus.REJECTED, TradeStatus.FAILED]
+        return bool(_STATUS_FLAGS.get(self.status, 0) & _CLOSED_MASK)
     
     def calculate_pnl(self, current_price: float) -> float:
         """Calculate unrealized P&L based on current price."""
@@ -150,3 +197,15 @@ class Trade(Base):
             self.status = TradeStatus.PARTIALLY_FILLED
         
         self.updated_at = datetime.utcnow()
+
+
+def mark_to_market(trades: Sequence[Trade], prices: Mapping[str, float]) -> np.ndarray:
+    """Vectorized calculate_pnl over many trades, priced from a symbol -> price map."""
+    count = len(trades)
+    avg = np.fromiter((t.average_price or 0.0 for t in trades), dtype=np.float64, count=count)
+    qty = np.fromiter((t.filled_quantity for t in trades), dtype=np.float64, count=count)
+    px = np.fromiter((prices[t.symbol] for t in trades), dtype=np.float64, count=count)
+    sign = np.where(np.fromiter((t.side == OrderSide.BUY for t in trades), dtype=np.bool_, count=count), 1.0, -1.0)
+    # Only fully filled trades with a known average price carry P&L
+    filled = np.fromiter((t.is_filled for t in trades), dtype=np.bool_, count=count) & (avg != 0.0)
+    return np.where(filled, sign * (px - avg) * qty, 0.0)
@@ -48,9 +48,9 @@ class User(Base):
     last_login: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
     
     # Relationships
-    strategies = relationship("Strategy", back_populates="user", cascade="all, delete-orphan")
-    trades = relationship("Trade", back_populates="user", cascade="all, delete-orphan")
-    alerts = relationship("Alert", back_populates="user", cascade="all, delete-orphan")
+    strategies = relationship("Strategy", back_populates="user", cascade="all, delete-orphan", lazy="raise")
+    trades = relationship("Trade", back_populates="user", cascade="all, delete-orphan", lazy="raise")
+    alerts = relationship("Alert", back_populates="user", cascade="all, delete-orphan", lazy="raise")
     
     def __repr__(self) -> str:
         return f"<User(id={self.id}, username={self.username}, email={self.email})>"
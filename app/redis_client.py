@@ -2,17 +2,48 @@
 Redis client for async task queuing and caching.
 """
 
-import json
+import time
 import asyncio
+import itertools
 from typing import Any, Dict, List, Optional, Union
-from datetime import datetime, timedelta
 
+import msgpack
+import orjson
 import redis.asyncio as redis
 from redis.asyncio import Redis
+from redis.exceptions import NoScriptError
 from loguru import logger
 
 from app.config import settings
 
+# Queue payloads are MessagePack-encoded with a shared packer
+_pack = msgpack.Packer(use_bin_type=True).pack
+# Pub/sub messages fall back to str() for non-native types such as datetimes
+_pack_message = msgpack.Packer(use_bin_type=True, default=str).pack
+
+# Cache values: naive datetimes are UTC throughout the app; numpy arrays serialize natively
+_CACHE_OPTIONS = orjson.OPT_NAIVE_UTC | orjson.OPT_SERIALIZE_NUMPY
+
+# Per-process sequence keeping task ids unique within the same microsecond
+_task_seq = itertools.count()
+
+# Fire-and-forget cache writes are coalesced for this long before one pipelined flush
+CACHE_FLUSH_INTERVAL = 0.005
+
+# Upper bound on pub/sub callbacks running concurrently per subscription
+SUBSCRIBER_CONCURRENCY = 64
+
+# Sliding-window rate limit check, done atomically in a single round trip.
+# KEYS[1]=key, ARGV: window_start, now, limit, window_seconds. Returns 1 if limited.
+RATE_LIMIT_LUA = """
+redis.call('ZREMRANGEBYSCORE', KEYS[1], 0, ARGV[1])
+local n = redis.call('ZCARD', KEYS[1])
+if n >= tonumber(ARGV[3]) then return 1 end
+redis.call('ZADD', KEYS[1], ARGV[2], ARGV[2])
+redis.call('EXPIRE', KEYS[1], ARGV[4])
+return 0
+"""
+
 
 class RedisClient:
     """Async Redis client for task queuing and caching."""
@@ -20,6 +51,10 @@ class RedisClient:
     def __init__(self):
         self._redis: Optional[Redis] = None
         self._connection_pool = None
+        self._rate_limit_sha: Optional[str] = None
+        self._pubsub_redis: Optional[Redis] = None
+        self._pending_cache_writes: List[tuple] = []
+        self._cache_flush_task: Optional[asyncio.Task] = None
     
     async def connect(self):
         """Connect to Redis server."""
@@ -27,13 +62,13 @@ class RedisClient:
             self._connection_pool = redis.ConnectionPool.from_url(
                 settings.redis_url,
                 password=settings.redis_password,
-                decode_responses=True,
                 max_connections=20
             )
             self._redis = Redis(connection_pool=self._connection_pool)
             
             # Test connection
             await self._redis.ping()
+            self._rate_limit_sha = await self._redis.script_load(RATE_LIMIT_LUA)
             logger.info("Connected to Redis successfully")
             
         except Exception as e:
@@ -42,6 +77,10 @@ class RedisClient:
     
     async def disconnect(self):
         """Disconnect from Redis server."""
+        if self._cache_flush_task:
+            await self._cache_flush_task
+        if self._pubsub_redis:
+            await self._pubsub_redis.close()
         if self._redis:
             await self._redis.close()
             logger.info("Disconnected from Redis")
@@ -54,21 +93,26 @@ class RedisClient:
         return self._redis
     
     # Queue Operations
+    def _build_task(self, queue_name: str, task_data: Dict[str, Any], priority: int, now: float) -> Dict[str, Any]:
+        """Build the queued task envelope; "ts" is the enqueue time in epoch seconds."""
+        return {
+            "id": f"{queue_name}:{int(now * 1e6):x}:{next(_task_seq):x}",
+            "data": task_data,
+            "priority": priority,
+            "ts": now,
+            "attempts": 0,
+            "max_attempts": 3
+        }
+    
     async def enqueue_task(self, queue_name: str, task_data: Dict[str, Any], priority: int = 0) -> bool:
         """Enqueue a task to the specified queue."""
         try:
-            task = {
-                "id": f"{queue_name}_{datetime.utcnow().timestamp()}",
-                "data": task_data,
-                "priority": priority,
-                "created_at": datetime.utcnow().isoformat(),
-                "attempts": 0,
-                "max_attempts": 3
-            }
+            now = time.time()
+            task = self._build_task(queue_name, task_data, priority, now)
             
             # Use priority-based queuing
-            score = priority + datetime.utcnow().timestamp()
-            await self.redis.zadd(f"queue:{queue_name}", {json.dumps(task): score})
+            score = priority + now
+            await self.redis.zadd(f"queue:{queue_name}", {_pack(task): score})
             
             logger.debug(f"Enqueued task to {queue_name}: {task['id']}")
             return True
@@ -77,6 +121,47 @@ class RedisClient:
             logger.error(f"Failed to enqueue task to {queue_name}: {e}")
             return False
     
+    async def enqueue_tasks_bulk(self, queue_name: str, items: List[Dict[str, Any]], priority: int = 0) -> bool:
+        """Enqueue many tasks to the specified queue with a single ZADD."""
+        if not items:
+            return True
+        
+        try:
+            now = time.time()
+            score = priority + now
+            mapping = {
+                _pack(self._build_task(queue_name, task_data, priority, now)): score
+                for task_data in items
+            }
+            
+            await self.redis.zadd(f"queue:{queue_name}", mapping)
+            
+            logger.debug(f"Enqueued {len(items)} tasks to {queue_name}")
+            return True
+            
+        except Exception as e:
+            logger.error(f"Failed to enqueue tasks to {queue_name}: {e}")
+            return False
+    
+    async def retry_task(self, queue_name: str, task: Dict[str, Any]) -> bool:
+        """Requeue a failed task, or move it to the dead-letter queue once its attempts run out."""
+        try:
+            # Same envelope (id, data, ts), so the handler sees the task exactly as first queued
+            task = {**task, "attempts": task.get("attempts", 0) + 1}
+            if task["attempts"] < task.get("max_attempts", 3):
+                target = queue_name
+            else:
+                target = f"{queue_name}:dead"
+            
+            await self.redis.zadd(f"queue:{target}", {_pack(task): task.get("priority", 0) + time.time()})
+            
+            logger.warning(f"Task {task['id']} failed (attempt {task['attempts']}), moved to {target}")
+            return True
+            
+        except Exception as e:
+            logger.error(f"Failed to requeue task {task.get('id')} on {queue_name}: {e}")
+            return False
+    
     async def dequeue_task(self, queue_name: str, timeout: int = 0) -> Optional[Dict[str, Any]]:
         """Dequeue a task from the specified queue."""
         try:
@@ -84,8 +169,8 @@ class RedisClient:
             result = await self.redis.bzpopmin(f"queue:{queue_name}", timeout=timeout)
             
             if result:
-                queue, task_json, score = result
-                task = json.loads(task_json)
+                queue, task_bytes, score = result
+                task = msgpack.unpackb(task_bytes, raw=False)
                 logger.debug(f"Dequeued task from {queue_name}: {task['id']}")
                 return task
             
@@ -95,6 +180,30 @@ class RedisClient:
             logger.error(f"Failed to dequeue task from {queue_name}: {e}")
             return None
     
+    async def dequeue_batch(self, queue_name: str, max_tasks: int = 32, timeout: int = 0) -> List[Dict[str, Any]]:
+        """Dequeue up to max_tasks tasks, blocking only until the first one arrives."""
+        try:
+            key = f"queue:{queue_name}"
+            result = await self.redis.bzpopmin(key, timeout=timeout)
+            
+            if not result:
+                return []
+            
+            queue, task_bytes, score = result
+            raw_tasks = [task_bytes]
+            if max_tasks > 1:
+                # Drain whatever else is already queued in one round-trip
+                rest = await self.redis.zpopmin(key, max_tasks - 1)
+                raw_tasks.extend(member for member, _ in rest)
+            
+            tasks = [msgpack.unpackb(raw, raw=False) for raw in raw_tasks]
+            logger.debug(f"Dequeued {len(tasks)} tasks from {queue_name}")
+            return tasks
+            
+        except Exception as e:
+            logger.error(f"Failed to dequeue tasks from {queue_name}: {e}")
+            return []
+    
     async def get_queue_size(self, queue_name: str) -> int:
         """Get the size of a queue."""
         try:
@@ -103,6 +212,31 @@ class RedisClient:
             logger.error(f"Failed to get queue size for {queue_name}: {e}")
             return 0
     
+    async def get_metrics_snapshot(self, queue_names: List[str]) -> Dict[str, Any]:
+        """Get server info and queue sizes in one pipelined round-trip."""
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.info()
+            for queue_name in queue_names:
+                pipe.zcard(f"queue:{queue_name}")
+            info, *sizes = await pipe.execute()
+            
+            return {
+                "redis": {
+                    "status": "healthy",
+                    "uptime": info.get("uptime_in_seconds"),
+                    "connected_clients": info.get("connected_clients"),
+                    "used_memory": info.get("used_memory_human")
+                },
+                "queues": dict(zip(queue_names, sizes))
+            }
+        except Exception as e:
+            logger.error(f"Failed to get Redis metrics: {e}")
+            return {
+                "redis": {"status": "unhealthy", "uptime": None, "connected_clients": None, "used_memory": None},
+                "queues": dict.fromkeys(queue_names, 0)
+            }
+    
     async def clear_queue(self, queue_name: str) -> bool:
         """Clear all tasks from a queue."""
         try:
@@ -114,22 +248,48 @@ class RedisClient:
             return False
     
     # Cache Operations
-    async def set_cache(self, key: str, value: Any, expire_seconds: Optional[int] = None) -> bool:
-        """Set a cache value."""
+    async def set_cache(
+        self,
+        key: str,
+        value: Any,
+        expire_seconds: Optional[int] = None,
+        fire_and_forget: bool = False
+    ) -> bool:
+        """Set a cache value; fire_and_forget batches the write and returns without waiting."""
         try:
-            serialized_value = json.dumps(value, default=str)
+            serialized_value = orjson.dumps(value, default=str, option=_CACHE_OPTIONS)
+            if fire_and_forget:
+                self._pending_cache_writes.append((key, serialized_value, expire_seconds))
+                if self._cache_flush_task is None:
+                    self._cache_flush_task = asyncio.create_task(self._flush_cache_writes())
+                return True
+            
             await self.redis.set(key, serialized_value, ex=expire_seconds)
             return True
         except Exception as e:
             logger.error(f"Failed to set cache key {key}: {e}")
             return False
     
+    async def _flush_cache_writes(self):
+        """Send all pending fire-and-forget cache writes in one pipeline."""
+        try:
+            await asyncio.sleep(CACHE_FLUSH_INTERVAL)
+            writes, self._pending_cache_writes = self._pending_cache_writes, []
+            self._cache_flush_task = None
+            
+            pipe = self.redis.pipeline(transaction=False)
+            for key, serialized_value, expire_seconds in writes:
+                pipe.set(key, serialized_value, ex=expire_seconds)
+            await pipe.execute()
+        except Exception as e:
+            logger.error(f"Failed to flush {len(writes)} cache writes: {e}")
+    
     async def get_cache(self, key: str) -> Optional[Any]:
         """Get a cache value."""
         try:
             value = await self.redis.get(key)
             if value:
-                return json.loads(value)
+                return orjson.loads(value)
             return None
         except Exception as e:
             logger.error(f"Failed to get cache key {key}: {e}")
@@ -152,12 +312,19 @@ class RedisClient:
             logger.error(f"Failed to check cache key {key}: {e}")
             return False
     
+    async def set_nx(self, key: str, value: Any = 1, expire_seconds: Optional[int] = None) -> bool:
+        """Set a key only if absent; False means it already existed. Errors fail open (True)."""
+        try:
+            return bool(await self.redis.set(key, value, ex=expire_seconds, nx=True))
+        except Exception as e:
+            logger.error(f"Failed to set cache key {key} if absent: {e}")
+            return True
+    
     # Pub/Sub Operations
     async def publish_message(self, channel: str, message: Dict[str, Any]) -> bool:
         """Publish a message to a channel."""
         try:
-            serialized_message = json.dumps(message, default=str)
-            subscribers = await self.redis.publish(channel, serialized_message)
+            subscribers = await self.redis.publish(channel, _pack_message(message))
             logger.debug(f"Published message to {channel}, {subscribers} subscribers")
             return True
         except Exception as e:
@@ -165,18 +332,39 @@ class RedisClient:
             return False
     
     async def subscribe_to_channel(self, channel: str, callback):
-        """Subscribe to a channel and call callback for each message."""
+        """Subscribe to a channel and run callback concurrently for each message."""
         try:
-            pubsub = self.redis.pubsub()
+            # Subscriptions hold their connection open, so keep them off the main pool
+            if self._pubsub_redis is None:
+                self._pubsub_redis = Redis.from_url(settings.redis_url, password=settings.redis_password)
+            pubsub = self._pubsub_redis.pubsub(ignore_subscribe_messages=True)
             await pubsub.subscribe(channel)
             
+            semaphore = asyncio.Semaphore(SUBSCRIBER_CONCURRENCY)
+            pending = set()
+            
+            async def dispatch(data):
+                try:
+                    await callback(channel, data)
+                except Exception as e:
+                    logger.error(f"Error processing message from {channel}: {e}")
+                finally:
+                    semaphore.release()
+            
             async for message in pubsub.listen():
-                if message['type'] == 'message':
-                    try:
-                        data = json.loads(message['data'])
-                        await callback(channel, data)
-                    except Exception as e:
-                        logger.error(f"Error processing message from {channel}: {e}")
+                if message['type'] != 'message':
+                    continue
+                try:
+                    data = msgpack.unpackb(message['data'], raw=False)
+                except Exception as e:
+                    logger.error(f"Error decoding message from {channel}: {e}")
+                    continue
+                
+                # Backpressure: stop reading once too many callbacks are in flight
+                await semaphore.acquire()
+                task = asyncio.create_task(dispatch(data))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
                         
         except Exception as e:
             logger.error(f"Failed to subscribe to {channel}: {e}")
@@ -185,20 +373,17 @@ class RedisClient:
     async def is_rate_limited(self, key: str, limit: int, window_seconds: int) -> bool:
         """Check if a key is rate limited."""
         try:
-            current_time = datetime.utcnow()
-            window_start = current_time - timedelta(seconds=window_seconds)
-            
-            # Use sliding window counter
-            pipe = self.redis.pipeline()
-            pipe.zremrangebyscore(key, 0, window_start.timestamp())
-            pipe.zcard(key)
-            pipe.zadd(key, {str(current_time.timestamp()): current_time.timestamp()})
-            pipe.expire(key, window_seconds)
+            now = time.time()
+            args = (1, key, now - window_seconds, now, limit, window_seconds)
             
-            results = await pipe.execute()
-            current_count = results[1]
+            try:
+                limited = await self.redis.evalsha(self._rate_limit_sha, *args)
+            except NoScriptError:
+                # Script cache was flushed (e.g. Redis restart); load it again
+                self._rate_limit_sha = await self.redis.script_load(RATE_LIMIT_LUA)
+                limited = await self.redis.evalsha(self._rate_limit_sha, *args)
             
-            return current_count >= limit
+            return limited == 1
             
         except Exception as e:
             logger.error(f"Failed to check rate limit for {key}: {e}")
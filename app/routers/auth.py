@@ -2,26 +2,47 @@
 Authentication routes for user management and JWT tokens.
 """
 
+import asyncio
+import hashlib
+import hmac
+import time
 import uuid
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Dict, NamedTuple, Optional, Tuple
 
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
-from passlib.context import CryptContext
-from jose import JWTError, jwt
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+import bcrypt
+from argon2 import PasswordHasher
+from argon2.exceptions import InvalidHashError, VerificationError
+from jose import JWTError, jwk, jwt
 from pydantic import BaseModel, EmailStr
 
 from app.db import get_db
 from app.models import User
 from app.config import settings
+from app.services.fyers_client import get_shared_client
+from app.services.user_cache import invalidate_active_user_ids
 from loguru import logger
 
 router = APIRouter()
 security = HTTPBearer()
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# argon2id for new hashes; legacy bcrypt hashes still verify and are upgraded on login
+password_hasher = PasswordHasher(time_cost=2, memory_cost=65536, parallelism=2)
+# JWT key constructed once; passing a Key skips per-call key parsing in jose
+_jwt_key = jwk.construct(settings.jwt_secret_key, settings.jwt_algorithm)
+
+# Recent successful logins: HMAC digest -> monotonic time verified
+LOGIN_CACHE_TTL = 60.0
+LOGIN_CACHE_MAX_SIZE = 10_000
+_verified_logins: Dict[bytes, float] = {}
+
+# Decoded bearer tokens: token -> (user id, exp epoch seconds)
+TOKEN_CACHE_MAX_SIZE = 10_000
+_decoded_tokens: Dict[str, Tuple[uuid.UUID, float]] = {}
 
 
 # Pydantic models
@@ -57,6 +78,13 @@ class TokenData(BaseModel):
     user_id: Optional[uuid.UUID] = None
 
 
+class AuthenticatedUser(NamedTuple):
+    """Minimal projection of the current user for routes that only need identity."""
+    id: uuid.UUID
+    email: str
+    is_active: bool
+
+
 class FyersAuthRequest(BaseModel):
     auth_code: str
 
@@ -70,14 +98,63 @@ class FyersAuthResponse(BaseModel):
 
 
 # Utility functions
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Verify a password against its hash."""
-    return pwd_context.verify(plain_password, hashed_password)
+def _verify_and_update(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """Verify a password, also returning a replacement hash if the stored one is outdated."""
+    if hashed_password.startswith("$2"):
+        if bcrypt.checkpw(plain_password.encode(), hashed_password.encode()):
+            return True, password_hasher.hash(plain_password)
+        return False, None
+    
+    try:
+        password_hasher.verify(hashed_password, plain_password)
+    except (VerificationError, InvalidHashError):
+        return False, None
+    
+    if password_hasher.check_needs_rehash(hashed_password):
+        return True, password_hasher.hash(plain_password)
+    return True, None
+
+
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    """Verify a password against its hash off the event loop."""
+    verified, _ = await asyncio.to_thread(_verify_and_update, plain_password, hashed_password)
+    return verified
+
+
+async def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """Verify a password off the event loop, with a replacement hash if the stored one is outdated."""
+    return await asyncio.to_thread(_verify_and_update, plain_password, hashed_password)
+
+
+async def get_password_hash(password: str) -> str:
+    """Hash a password off the event loop."""
+    return await asyncio.to_thread(password_hasher.hash, password)
 
 
-def get_password_hash(password: str) -> str:
-    """Hash a password."""
-    return pwd_context.hash(password)
+def _login_cache_key(email: str, password: str, hashed_password: str) -> bytes:
+    """Secret-keyed digest of a credential pair; the stored hash ties it to the current password."""
+    message = f"{email}:{hashlib.sha256(password.encode()).hexdigest()}:{hashed_password}"
+    return hmac.new(settings.jwt_secret_key.encode(), message.encode(), hashlib.sha256).digest()
+
+
+async def verify_login(user: User, password: str) -> bool:
+    """Verify login credentials, skipping the password hash for a pair verified in the last minute."""
+    now = time.monotonic()
+    verified_at = _verified_logins.get(_login_cache_key(user.email, password, user.hashed_password))
+    if verified_at is not None and now - verified_at < LOGIN_CACHE_TTL:
+        return True
+    
+    verified, new_hash = await verify_and_update_password(password, user.hashed_password)
+    if not verified:
+        return False
+    if new_hash:
+        # Migrate legacy bcrypt hashes; committed with the login update
+        user.hashed_password = new_hash
+    
+    if len(_verified_logins) >= LOGIN_CACHE_MAX_SIZE:
+        _verified_logins.clear()
+    _verified_logins[_login_cache_key(user.email, password, user.hashed_password)] = now
+    return True
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
@@ -89,7 +166,7 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
         expire = datetime.utcnow() + timedelta(minutes=settings.jwt_access_token_expire_minutes)
     
     to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, settings.jwt_secret_key, algorithm=settings.jwt_algorithm)
+    encoded_jwt = jwt.encode(to_encode, _jwt_key, algorithm=settings.jwt_algorithm)
     return encoded_jwt
 
 
@@ -98,40 +175,78 @@ def create_refresh_token(data: dict) -> str:
     to_encode = data.copy()
     expire = datetime.utcnow() + timedelta(days=settings.jwt_refresh_token_expire_days)
     to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, settings.jwt_secret_key, algorithm=settings.jwt_algorithm)
+    encoded_jwt = jwt.encode(to_encode, _jwt_key, algorithm=settings.jwt_algorithm)
     return encoded_jwt
 
 
-async def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: AsyncSession = Depends(get_db)
-) -> User:
-    """Get current authenticated user."""
-    credentials_exception = HTTPException(
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+
+def decode_user_id(token: str) -> uuid.UUID:
+    """Decode a bearer token and return its subject user id; verified tokens are cached until expiry."""
+    cached = _decoded_tokens.get(token)
+    if cached is not None:
+        user_id, expires_at = cached
+        if time.time() < expires_at:
+            return user_id
+        del _decoded_tokens[token]
+        raise _credentials_exception()
     
     try:
-        token = credentials.credentials
-        payload = jwt.decode(token, settings.jwt_secret_key, algorithms=[settings.jwt_algorithm])
-        user_id: str = payload.get("sub")
-        if user_id is None:
-            raise credentials_exception
-    except JWTError:
-        raise credentials_exception
+        payload = jwt.decode(token, _jwt_key, algorithms=[settings.jwt_algorithm])
+        sub: str = payload.get("sub")
+        if sub is None:
+            raise _credentials_exception()
+        user_id = uuid.UUID(sub)
+    except (JWTError, ValueError):
+        raise _credentials_exception()
     
-    user_query = select(User).where(User.id == uuid.UUID(user_id))
+    if "exp" in payload:
+        if len(_decoded_tokens) >= TOKEN_CACHE_MAX_SIZE:
+            _decoded_tokens.clear()
+        _decoded_tokens[token] = (user_id, float(payload["exp"]))
+    return user_id
+
+
+async def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncSession = Depends(get_db)
+) -> User:
+    """Get current authenticated user."""
+    user_query = select(User).where(User.id == decode_user_id(credentials.credentials))
     result = await db.execute(user_query)
     user = result.scalar_one_or_none()
     
     if user is None:
-        raise credentials_exception
+        raise _credentials_exception()
     
     return user
 
 
+async def get_authenticated_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncSession = Depends(get_db)
+) -> AuthenticatedUser:
+    """Get the current active user's identity without loading the full row."""
+    user_query = select(User.id, User.email, User.is_active).where(
+        User.id == decode_user_id(credentials.credentials)
+    )
+    result = await db.execute(user_query)
+    row = result.one_or_none()
+    
+    if row is None:
+        raise _credentials_exception()
+    if not row.is_active:
+        raise HTTPException(status_code=400, detail="Inactive user")
+    
+    return AuthenticatedUser(*row)
+
+
 async def get_current_active_user(current_user: User = Depends(get_current_user)) -> User:
     """Get current active user."""
     if not current_user.is_active:
@@ -143,45 +258,40 @@ async def get_current_active_user(current_user: User = Depends(get_current_user)
 @router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
 async def register_user(user_data: UserCreate, db: AsyncSession = Depends(get_db)):
     """Register a new user."""
-    # Check if user already exists
-    existing_user_query = select(User).where(
-        (User.email == user_data.email) | (User.username == user_data.username)
-    )
-    existing_user_result = await db.execute(existing_user_query)
-    existing_user = existing_user_result.scalar_one_or_none()
+    hashed_password = await get_password_hash(user_data.password)
+    created_at = datetime.utcnow()
     
-    if existing_user:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Email or username already registered"
-        )
-    
-    # Create new user
-    hashed_password = get_password_hash(user_data.password)
-    user = User(
+    # The unique email/username indexes reject duplicates in the same round trip
+    insert_stmt = pg_insert(User).values(
         email=user_data.email,
         username=user_data.username,
         full_name=user_data.full_name,
         hashed_password=hashed_password,
         is_active=True,
         is_verified=True,  # Auto-verify for now
-        created_at=datetime.utcnow()
-    )
+        created_at=created_at
+    ).on_conflict_do_nothing().returning(User.id)
+    user_id = (await db.execute(insert_stmt)).scalar_one_or_none()
+    
+    if user_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Email or username already registered"
+        )
     
-    db.add(user)
     await db.commit()
-    await db.refresh(user)
+    await invalidate_active_user_ids()
     
-    logger.info(f"New user registered: {user.email}")
+    logger.info(f"New user registered: {user_data.email}")
     
     return UserResponse(
-        id=user.id,
-        email=user.email,
-        username=user.username,
-        full_name=user.full_name,
-        is_active=user.is_active,
-        is_verified=user.is_verified,
-        created_at=user.created_at
+        id=user_id,
+        email=user_data.email,
+        username=user_data.username,
+        full_name=user_data.full_name,
+        is_active=True,
+        is_verified=True,
+        created_at=created_at
     )
 
 
@@ -193,7 +303,7 @@ async def login_user(user_credentials: UserLogin, db: AsyncSession = Depends(get
     user_result = await db.execute(user_query)
     user = user_result.scalar_one_or_none()
     
-    if not user or not verify_password(user_credentials.password, user.hashed_password):
+    if not user or not await verify_login(user, user_credentials.password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
@@ -247,9 +357,7 @@ async def authenticate_fyers(
 ):
     """Authenticate with Fyers API and store credentials."""
     try:
-        from app.services.fyers_client import FyersClient
-        
-        fyers_client = FyersClient()
+        fyers_client = get_shared_client()
         token_response = await fyers_client.get_access_token(auth_request.auth_code)
         
         if "access_token" in token_response:
@@ -291,9 +399,7 @@ async def authenticate_fyers(
 async def get_fyers_auth_url():
     """Get Fyers authentication URL."""
     try:
-        from app.services.fyers_client import FyersClient
-        
-        fyers_client = FyersClient()
+        fyers_client = get_shared_client()
         auth_url = await fyers_client.get_auth_url()
         
         return {"auth_url": auth_url}
@@ -319,9 +425,7 @@ async def refresh_access_token(
                 detail="No refresh token available"
             )
         
-        from app.services.fyers_client import FyersClient
-        
-        fyers_client = FyersClient()
+        fyers_client = get_shared_client()
         token_response = await fyers_client.refresh_access_token(current_user.fyers_refresh_token)
         
         if "access_token" in token_response:
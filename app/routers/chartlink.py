@@ -2,29 +2,35 @@
 Chartlink webhook endpoint for receiving trading signals.
 """
 
+import asyncio
 import uuid
 import hashlib
 import hmac
-import json
 from datetime import datetime
-from typing import Dict, Any, Optional, List
+from functools import lru_cache
+from typing import Dict, Any, Optional, List, Union
 
+import msgspec
+import orjson
 from fastapi import APIRouter, Request, HTTPException, status, Depends, Body
+from fastapi.responses import ORJSONResponse
 from fastapi.security import HTTPBearer
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from pydantic import BaseModel, Field
+from uuid_utils.compat import uuid7
 from loguru import logger
 
 from app.db import get_db
-from app.models import User, Alert, AlertType, AlertSource, AlertStatus
+from app.models import Alert, AlertType, AlertSource, AlertStatus, ScanBatch
 from app.config import settings
 from app.redis_client import redis_client
+from app.services.alert_fanout import SIGNAL_QUEUE, insert_alerts_for_active_users
+from app.services.user_cache import get_active_user_ids
 
 router = APIRouter()
 security = HTTPBearer()
 
-
 # Pydantic models for webhook data
 class ChartlinkSignal(BaseModel):
     """Trading signal format (BUY/SELL order)"""
@@ -50,46 +56,83 @@ class ChartlinkScanPayload(BaseModel):
     metadata: Optional[Dict[str, Any]] = Field(default_factory=dict, description="Additional metadata")
 
 
+class SignalPayload(msgspec.Struct, kw_only=True):
+    """Webhook trading signal; validated in C without building a pydantic model."""
+    symbol: str
+    action: str
+    price: Optional[float] = None
+    quantity: Optional[int] = None
+    message: Optional[str] = None
+    timestamp: Union[str, float, None] = None
+    metadata: Dict[str, Any] = {}
+
+
 class WebhookResponse(BaseModel):
     success: bool
     message: str
     alert_id: Optional[uuid.UUID] = None
 
 
-def verify_webhook_signature(payload: bytes, signature: str, secret: str) -> bool:
+# Bodies at least this large are hashed in a worker thread rather than on the event loop
+HMAC_OFFLOAD_BYTES = 65536
+
+
+@lru_cache(maxsize=4)
+def _hmac_prototype(secret: str) -> hmac.HMAC:
+    """Key an HMAC once per secret; copies skip the per-request key padding."""
+    return hmac.new(secret.encode(), digestmod=hashlib.sha256)
+
+
+def _compute_signature(payload: bytes, secret: str) -> bytes:
+    """HMAC-SHA256 digest of a webhook body."""
+    mac = _hmac_prototype(secret).copy()
+    mac.update(payload)
+    return mac.digest()
+
+
+async def verify_webhook_signature(payload: bytes, signature: str, secret: str) -> bool:
     """Verify webhook signature."""
     try:
-        expected_signature = hmac.new(
-            secret.encode(),
-            payload,
-            hashlib.sha256
-        ).hexdigest()
+        if len(payload) < HMAC_OFFLOAD_BYTES:
+            expected_digest = _compute_signature(payload, secret)
+        else:
+            # hashlib drops the GIL on large inputs, so other requests keep running meanwhile
+            expected_digest = await asyncio.to_thread(_compute_signature, payload, secret)
         
-        return hmac.compare_digest(signature, expected_signature)
+        # Compare raw digests; a malformed hex signature raises and is rejected below
+        return hmac.compare_digest(bytes.fromhex(signature), expected_digest)
     except Exception as e:
         logger.error(f"Error verifying webhook signature: {e}")
         return False
 
 
+# How long a scan's idempotency key blocks replays
+SCAN_REPLAY_TTL = 86400
+
+
+# Chartlink action -> AlertType
+ACTION_MAPPING = {
+    "BUY": AlertType.BUY,
+    "SELL": AlertType.SELL,
+    "HOLD": AlertType.HOLD,
+    "STOP_LOSS": AlertType.STOP_LOSS,
+    "TAKE_PROFIT": AlertType.TAKE_PROFIT
+}
+# Lowercase spellings are common enough to look up without calling upper()
+ACTION_MAPPING.update({action.lower(): alert_type for action, alert_type in ACTION_MAPPING.items()})
+
+
 def parse_symbol(symbol: str) -> tuple[str, str]:
     """Parse symbol into exchange and symbol."""
-    if ":" in symbol:
-        exchange, symbol_name = symbol.split(":", 1)
+    exchange, sep, symbol_name = symbol.partition(":")
+    if sep:
         return exchange.upper(), symbol_name
-    else:
-        return "NSE", symbol  # Default to NSE
+    return "NSE", symbol  # Default to NSE
 
 
 def map_action_to_alert_type(action: str) -> AlertType:
     """Map Chartlink action to AlertType."""
-    action_mapping = {
-        "BUY": AlertType.BUY,
-        "SELL": AlertType.SELL,
-        "HOLD": AlertType.HOLD,
-        "STOP_LOSS": AlertType.STOP_LOSS,
-        "TAKE_PROFIT": AlertType.TAKE_PROFIT
-    }
-    return action_mapping.get(action.upper(), AlertType.HOLD)
+    return ACTION_MAPPING.get(action) or ACTION_MAPPING.get(action.upper(), AlertType.HOLD)
 
 
 def is_chartlink_scan_payload(data: Dict[str, Any]) -> bool:
@@ -105,24 +148,27 @@ def parse_chartlink_scan(scan_data: Dict[str, Any]) -> List[Dict[str, Any]]:
     stocks_str = scan_data.get("stocks", "")
     prices_str = scan_data.get("trigger_prices", "")
     
-    stocks = [s.strip() for s in stocks_str.split(",") if s.strip()]
+    stocks = [s for s in map(str.strip, stocks_str.split(",")) if s]
     prices = []
     
     if prices_str:
         try:
-            prices = [float(p.strip()) if p.strip() else None for p in prices_str.split(",")]
-        except (ValueError, AttributeError):
+            # Fast path for fully populated prices; float() tolerates surrounding whitespace
+            prices = list(map(float, prices_str.split(",")))
+        except ValueError:
+            try:
+                prices = [float(p) if p.strip() else None for p in prices_str.split(",")]
+            except ValueError:
+                prices = []
+        except AttributeError:
             prices = []
     
     # Match stocks with their prices
-    items = []
-    for i, stock in enumerate(stocks):
-        items.append({
-            "symbol": stock,
-            "trigger_price": prices[i] if i < len(prices) else None
-        })
-    
-    return items
+    prices.extend([None] * (len(stocks) - len(prices)))
+    return [
+        {"symbol": stock, "trigger_price": price}
+        for stock, price in zip(stocks, prices)
+    ]
 
 
 def generate_idempotency_key(scan_data: Dict[str, Any]) -> str:
@@ -137,11 +183,30 @@ def generate_idempotency_key(scan_data: Dict[str, Any]) -> str:
         return f"chartlink_scan_{key_hash[:16]}"
     
     # Fallback to hash of entire payload
-    payload_str = json.dumps(scan_data, sort_keys=True)
-    key_hash = hashlib.sha256(payload_str.encode()).hexdigest()
+    key_hash = hashlib.sha256(orjson.dumps(scan_data, option=orjson.OPT_SORT_KEYS)).hexdigest()
     return f"chartlink_{key_hash[:16]}"
 
 
+async def read_body_capped(request: Request, max_bytes: int) -> bytearray:
+    """Read the request body incrementally, rejecting it once it exceeds max_bytes."""
+    too_large = HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail="Webhook payload too large"
+    )
+    
+    # Honest clients declare the size up front, so most oversized bodies are never read
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > max_bytes:
+        raise too_large
+    
+    body = bytearray()
+    async for chunk in request.stream():
+        body += chunk
+        if len(body) > max_bytes:
+            raise too_large
+    return body
+
+
 @router.post("/chartlink", response_model=WebhookResponse)
 async def receive_chartlink_webhook(
     request: Request,
@@ -149,27 +214,28 @@ async def receive_chartlink_webhook(
 ):
     """Receive trading signals and scans from Chartlink webhook."""
     try:
-        # Get raw request body
-        body_bytes = await request.body()
-        body = json.loads(body_bytes)
+        # Get raw request body; HMAC and orjson both read the bytearray without a copy
+        body_bytes = await read_body_capped(request, settings.chartlink_max_body_bytes)
         
-        # Verify webhook signature if secret is configured
+        # Verify webhook signature if secret is configured; unsigned bodies are never parsed
         if settings.chartlink_webhook_secret:
             signature = request.headers.get("X-Chartlink-Signature", "")
-            if not verify_webhook_signature(body_bytes, signature, settings.chartlink_webhook_secret):
+            if not await verify_webhook_signature(body_bytes, signature, settings.chartlink_webhook_secret):
                 logger.warning("Invalid webhook signature")
                 raise HTTPException(
                     status_code=status.HTTP_401_UNAUTHORIZED,
                     detail="Invalid webhook signature"
                 )
         
+        body = orjson.loads(body_bytes)
+        
         # Check if this is a scan payload
         if is_chartlink_scan_payload(body):
-            return await _handle_scan_payload(body, body_bytes, db)
+            return await _handle_scan_payload(body, db)
         else:
-            return await _handle_signal_payload(body, db)
+            return await _handle_signal_payload(body)
             
-    except json.JSONDecodeError as e:
+    except orjson.JSONDecodeError as e:
         logger.error(f"Invalid JSON in webhook payload: {e}")
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -185,12 +251,9 @@ async def receive_chartlink_webhook(
         )
 
 
-async def _handle_scan_payload(
-    scan_data: Dict[str, Any],
-    body_bytes: bytes,
-    db: AsyncSession
-) -> WebhookResponse:
+async def _handle_scan_payload(scan_data: Dict[str, Any], db: AsyncSession) -> WebhookResponse:
     """Handle Chartlink scan alert (no trading fields)."""
+    replay_key = None
     try:
         # Parse scan items
         items = parse_chartlink_scan(scan_data)
@@ -199,60 +262,72 @@ async def _handle_scan_payload(
                    f"triggered_at: {scan_data.get('triggered_at')}, "
                    f"stocks count: {len(items)}")
         
-        # Get all active users
-        users_query = select(User).where(User.is_active == True)
-        users_result = await db.execute(users_query)
-        users = users_result.scalars().all()
+        # Generate idempotency key
+        external_id = generate_idempotency_key(scan_data)
         
-        if not users:
-            logger.warning("No active users found for scan processing")
+        # Retried fires stop here with one Redis round trip instead of a full fan-out
+        replay_key = f"idemp:{external_id}"
+        if not await redis_client.set_nx(replay_key, expire_seconds=SCAN_REPLAY_TTL):
+            logger.info(f"Duplicate Chartlink scan ignored: {external_id}")
             return WebhookResponse(
-                success=False,
-                message="No active users found"
+                success=True,
+                message="Duplicate scan ignored"
             )
         
-        # Generate idempotency key
-        external_id = generate_idempotency_key(scan_data)
-        
         # Get first stock for symbol field
         first_symbol = items[0]["symbol"] if items else "UNKNOWN"
         exchange, symbol = parse_symbol(first_symbol)
         
-        alert_ids = []
-        for user in users:
-            # Store scan as informational alert (not for trade execution)
-            alert = Alert(
-                user_id=user.id,
-                symbol=symbol,
-                exchange=exchange,
-                alert_type=AlertType.HOLD,  # Scan alerts don't have explicit action
-                source=AlertSource.CHARTLINK,
-                price=float(items[0]["trigger_price"]) if items and items[0]["trigger_price"] else None,
-                quantity=None,  # No quantity for scans
-                message=scan_data.get("alert_name") or scan_data.get("scan_name"),
-                metadata={
-                    "is_scan_alert": True,
-                    "scan_name": scan_data.get("scan_name"),
-                    "triggered_at": scan_data.get("triggered_at"),
-                    "scan_url": scan_data.get("scan_url"),
-                    "webhook_url": scan_data.get("webhook_url"),
-                    "stocks": items,
-                    "raw_payload": scan_data,
-                    "stocks_count": len(items)
-                },
-                external_id=external_id,
-                external_source="chartlink_scan",
-                status=AlertStatus.RECEIVED,  # Received, not processed
-                created_at=datetime.utcnow()
+        # The heavy payload is stored once; per-user alerts only reference it
+        scan_batch = ScanBatch(
+            id=uuid7(),
+            external_id=external_id,
+            scan_name=scan_data.get("scan_name"),
+            triggered_at=scan_data.get("triggered_at"),
+            stocks_count=len(items),
+            stocks=items,
+            raw_payload=scan_data,
+            created_at=datetime.utcnow()
+        )
+        db.add(scan_batch)
+        
+        # Store scan as informational alerts (not for trade execution), one row per active user
+        alert_fields = {
+            "symbol": symbol,
+            "exchange": exchange,
+            "alert_type": AlertType.HOLD,  # Scan alerts don't have explicit action
+            "source": AlertSource.CHARTLINK,
+            "price": float(items[0]["trigger_price"]) if items and items[0]["trigger_price"] else None,
+            "quantity": None,  # No quantity for scans
+            "message": scan_data.get("alert_name") or scan_data.get("scan_name"),
+            "extra_metadata": {
+                "is_scan_alert": True,
+                "scan_batch_id": str(scan_batch.id),
+                "scan_name": scan_batch.scan_name,
+                "triggered_at": scan_batch.triggered_at,
+                "stocks_count": len(items)
+            },
+            "external_id": external_id,
+            "external_source": "chartlink_scan",
+            "status": AlertStatus.RECEIVED,  # Received, not processed
+            "created_at": scan_batch.created_at
+        }
+        # Autoflush writes the batch row ahead of the alert INSERT
+        alert_ids = await insert_alerts_for_active_users(db, alert_fields)
+        
+        if not alert_ids:
+            # No active users, or a retried scan whose alerts already exist
+            await db.rollback()
+            # Nothing was stored, so a later fire of this scan must not be treated as a replay
+            await redis_client.delete_cache(replay_key)
+            logger.warning(f"No new alerts created for scan {external_id}")
+            return WebhookResponse(
+                success=False,
+                message="No active users found or scan already stored"
             )
-            
-            db.add(alert)
-            await db.flush()
-            alert_ids.append(alert.id)
-            
-            # Don't enqueue scan alerts for trade processing
-            # They're informational only
         
+        # Don't enqueue scan alerts for trade processing
+        # They're informational only
         await db.commit()
         
         logger.info(f"Stored Chartlink scan alert, created {len(alert_ids)} alerts for {len(items)} stocks")
@@ -265,26 +340,32 @@ async def _handle_scan_payload(
         
     except Exception as e:
         logger.error(f"Error handling scan payload: {e}")
+        # Release the replay guard so Chartlink's retry is processed
+        if replay_key:
+            await redis_client.delete_cache(replay_key)
         raise
 
 
-async def _handle_signal_payload(
-    signal_data: Dict[str, Any],
-    db: AsyncSession
-) -> WebhookResponse:
-    """Handle Chartlink trading signal (BUY/SELL order)."""
+async def _handle_signal_payload(signal_data: Dict[str, Any]) -> WebhookResponse:
+    """Handle Chartlink trading signal (BUY/SELL order) by queueing it for fan-out."""
     try:
-        # Validate and parse signal
-        if not signal_data.get("symbol") or not signal_data.get("action"):
+        # Validate field types here, since the row insert happens later in a worker
+        try:
+            signal = msgspec.convert(signal_data, SignalPayload)
+        except msgspec.ValidationError as e:
+            return WebhookResponse(
+                success=False,
+                message=f"Invalid signal payload: {e}"
+            )
+        
+        if not signal.symbol or not signal.action:
             return WebhookResponse(
                 success=False,
                 message="Missing required fields: symbol and action"
             )
         
-        symbol = signal_data["symbol"]
-        action = signal_data["action"]
-        price = signal_data.get("price")
-        quantity = signal_data.get("quantity")
+        symbol = signal.symbol
+        action = signal.action
         
         # Parse symbol
         exchange, symbol_name = parse_symbol(symbol)
@@ -292,61 +373,35 @@ async def _handle_signal_payload(
         # Map action to alert type
         alert_type = map_action_to_alert_type(action)
         
-        # Get all active users
-        users_query = select(User).where(User.is_active == True)
-        users_result = await db.execute(users_query)
-        users = users_result.scalars().all()
-        
-        if not users:
-            logger.warning("No active users found for signal processing")
-            return WebhookResponse(
-                success=False,
-                message="No active users found"
-            )
-        
-        # Create alerts for each user
-        alert_ids = []
-        for user in users:
-            alert = Alert(
-                user_id=user.id,
-                symbol=symbol_name,
-                exchange=exchange,
-                alert_type=alert_type,
-                source=AlertSource.CHARTLINK,
-                price=price,
-                quantity=quantity,
-                message=signal_data.get("message"),
-                metadata={
-                    "original_symbol": symbol,
-                    "timestamp": signal_data.get("timestamp"),
-                    "raw_payload": signal_data,
-                    **signal_data.get("metadata", {})
-                },
-                external_id=f"chartlink_{datetime.utcnow().timestamp()}",
-                external_source="chartlink",
-                status=AlertStatus.RECEIVED,
-                created_at=datetime.utcnow()
-            )
-            
-            db.add(alert)
-            await db.flush()
-            alert_ids.append(alert.id)
-            
-            # Enqueue alert for trade processing
-            await redis_client.enqueue_task(
-                "alert_processing",
-                {"alert_id": str(alert.id)},
-                priority=1  # High priority for real-time signals
+        # Per-user alert rows are written by the signal worker, so the response
+        # time no longer grows with the number of users
+        alert_fields = {
+            "symbol": symbol_name,
+            "exchange": exchange,
+            "alert_type": alert_type.value,
+            "price": signal.price,
+            "quantity": signal.quantity,
+            "message": signal.message,
+            "extra_metadata": {
+                "original_symbol": symbol,
+                "timestamp": signal.timestamp,
+                "raw_payload": signal_data,
+                **signal.metadata
+            },
+            "external_id": f"chartlink_{uuid7().hex}",  # One id per signal, shared by its per-user rows
+            "external_source": "chartlink"
+        }
+        if not await redis_client.enqueue_task(SIGNAL_QUEUE, alert_fields, priority=1):
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Failed to queue signal"
             )
         
-        await db.commit()
-        
-        logger.info(f"Received Chartlink signal: {symbol} {action}, created {len(alert_ids)} alerts")
+        logger.info(f"Received Chartlink signal: {symbol} {action}, queued for fan-out")
         
         return WebhookResponse(
             success=True,
-            message=f"Signal processed successfully, created {len(alert_ids)} alerts",
-            alert_id=alert_ids[0] if alert_ids else None
+            message="Signal accepted for processing"
         )
         
     except Exception as e:
@@ -368,19 +423,18 @@ async def test_signal(
         alert_type = map_action_to_alert_type(signal_data.action)
         
         # Get first active user for testing
-        users_query = select(User).where(User.is_active == True)
-        users_result = await db.execute(users_query)
-        user = users_result.scalar_one_or_none()
+        user_ids = await get_active_user_ids(db)
         
-        if not user:
+        if not user_ids:
             return WebhookResponse(
                 success=False,
                 message="No active users found"
             )
         
-        # Create test alert
+        # Create test alert; the id is assigned client-side so no flush is needed before enqueueing
         alert = Alert(
-            user_id=user.id,
+            id=uuid.uuid4(),
+            user_id=user_ids[0],
             symbol=symbol,
             exchange=exchange,
             alert_type=alert_type,
@@ -388,19 +442,19 @@ async def test_signal(
             price=signal_data.price,
             quantity=signal_data.quantity,
             message=f"Test signal: {signal_data.message}",
-            metadata={
+            extra_metadata={
                 "test": True,
                 "original_symbol": signal_data.symbol,
                 **signal_data.metadata
             },
-            external_id=f"test_{datetime.utcnow().timestamp()}",
+            external_id=f"test_{uuid7().hex}",
             external_source="test",
             status=AlertStatus.RECEIVED,
             created_at=datetime.utcnow()
         )
         
         db.add(alert)
-        await db.flush()
+        await db.commit()
         
         # Enqueue for processing
         await redis_client.enqueue_task(
@@ -409,8 +463,6 @@ async def test_signal(
             priority=1
         )
         
-        await db.commit()
-        
         logger.info(f"Created test signal: {signal_data.symbol} {signal_data.action}")
         
         return WebhookResponse(
@@ -434,14 +486,8 @@ async def test_scan(
 ):
     """Test endpoint for creating sample scan alerts."""
     try:
-        # Convert Pydantic model to dict
-        body = scan_data.model_dump()
-        
-        # Create a minimal body_bytes for the handler
-        body_bytes = json.dumps(body).encode()
-        
         # Use the same handler as the webhook
-        return await _handle_scan_payload(body, body_bytes, db)
+        return await _handle_scan_payload(scan_data.model_dump(), db)
         
     except Exception as e:
         logger.error(f"Error creating test scan: {e}")
@@ -451,6 +497,23 @@ async def test_scan(
         )
 
 
+# Response key -> column for the recent alerts feed
+RECENT_ALERT_COLUMNS = {
+    "id": Alert.id,
+    "symbol": Alert.symbol,
+    "exchange": Alert.exchange,
+    "alert_type": Alert.alert_type,
+    "source": Alert.source,
+    "status": Alert.status,
+    "price": Alert.price,
+    "quantity": Alert.quantity,
+    "message": Alert.message,
+    "created_at": Alert.created_at,
+    "processed_at": Alert.processed_at,
+    "metadata": Alert.extra_metadata
+}
+
+
 @router.get("/alerts/recent")
 async def get_recent_alerts(
     limit: int = 50,
@@ -458,30 +521,14 @@ async def get_recent_alerts(
 ):
     """Get recent alerts for monitoring."""
     try:
-        alerts_query = select(Alert).order_by(Alert.created_at.desc()).limit(limit)
+        # Only the response columns; rows skip ORM hydration and the identity map
+        alerts_query = select(*RECENT_ALERT_COLUMNS.values()).order_by(Alert.created_at.desc()).limit(limit)
         alerts_result = await db.execute(alerts_query)
-        alerts = alerts_result.scalars().all()
-        
-        return {
-            "alerts": [
-                {
-                    "id": alert.id,
-                    "symbol": alert.symbol,
-                    "exchange": alert.exchange,
-                    "alert_type": alert.alert_type.value,
-                    "source": alert.source.value,
-                    "status": alert.status.value,
-                    "price": alert.price,
-                    "quantity": alert.quantity,
-                    "message": alert.message,
-                    "created_at": alert.created_at,
-                    "processed_at": alert.processed_at,
-                    "metadata": alert.metadata
-                }
-                for alert in alerts
-            ],
-            "total": len(alerts)
-        }
+        alerts = [dict(zip(RECENT_ALERT_COLUMNS, row)) for row in alerts_result]
+        
+        # Returned directly so FastAPI skips jsonable_encoder; orjson handles UUIDs,
+        # datetimes and str enums natively
+        return ORJSONResponse({"alerts": alerts, "total": len(alerts)})
         
     except Exception as e:
         logger.error(f"Error fetching recent alerts: {e}")
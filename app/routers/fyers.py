@@ -2,23 +2,34 @@
 Fyers API integration routes.
 """
 
+import asyncio
 import uuid
 from datetime import datetime
-from typing import Dict, Any, List, Optional
+from typing import Awaitable, Callable, Dict, Any, List, Optional
 
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import ORJSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import insert, select, update
 from pydantic import BaseModel, Field
 from loguru import logger
+from uuid_utils.compat import uuid7
 
 from app.db import get_db
-from app.models import User, Trade, TradeStatus
-from app.services.fyers_client import FyersClient, FyersAPIError
+from app.models import User, Trade, TradeStatus, OrderType, OrderSide
+from app.services.fyers_client import FyersClient, FyersAPIError, get_shared_client, get_client_for_token
+from app.services.ttl_cache import cached
 from app.routers.auth import get_current_active_user
 
 router = APIRouter()
 
+# Market data is re-requested by dashboards within seconds of itself
+MARKET_STATUS_TTL = 5.0
+QUOTES_TTL = 2.0
+
+# Core INSERT for order records: one round-trip, no ORM unit of work
+INSERT_TRADE = insert(Trade)
+
 
 # Pydantic models
 class OrderRequest(BaseModel):
@@ -52,20 +63,24 @@ class FundsResponse(BaseModel):
     total_funds: float
 
 
+async def get_fyers_client(current_user: User = Depends(get_current_active_user)) -> FyersClient:
+    """Get the Fyers client for the current user, rejecting users without credentials."""
+    if not current_user.has_fyers_credentials():
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="No valid Fyers credentials found"
+        )
+    
+    return await get_client_for_token(current_user.fyers_access_token)
+
+
 @router.get("/profile")
-async def get_fyers_profile(current_user: User = Depends(get_current_active_user)):
+async def get_fyers_profile(fyers_client: FyersClient = Depends(get_fyers_client)):
     """Get Fyers user profile."""
     try:
-        if not current_user.has_fyers_credentials():
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="No valid Fyers credentials found"
-            )
-        
-        fyers_client = FyersClient(current_user.fyers_access_token)
         profile = await fyers_client.get_profile()
         
-        return profile
+        return ORJSONResponse(profile)
         
     except FyersAPIError as e:
         logger.error(f"Fyers API error: {e}")
@@ -82,16 +97,9 @@ async def get_fyers_profile(current_user: User = Depends(get_current_active_user
 
 
 @router.get("/funds", response_model=FundsResponse)
-async def get_funds(current_user: User = Depends(get_current_active_user)):
+async def get_funds(fyers_client: FyersClient = Depends(get_fyers_client)):
     """Get available funds."""
     try:
-        if not current_user.has_fyers_credentials():
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="No valid Fyers credentials found"
-            )
-        
-        fyers_client = FyersClient(current_user.fyers_access_token)
         funds_data = await fyers_client.get_funds()
         
         if funds_data.get("data"):
@@ -122,31 +130,23 @@ async def get_funds(current_user: User = Depends(get_current_active_user)):
 
 
 @router.get("/positions", response_model=List[PositionResponse])
-async def get_positions(current_user: User = Depends(get_current_active_user)):
+async def get_positions(fyers_client: FyersClient = Depends(get_fyers_client)):
     """Get current positions."""
     try:
-        if not current_user.has_fyers_credentials():
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="No valid Fyers credentials found"
-            )
-        
-        fyers_client = FyersClient(current_user.fyers_access_token)
         positions_data = await fyers_client.get_positions()
         
-        positions = []
-        if positions_data.get("data"):
-            for position in positions_data["data"]:
-                positions.append(PositionResponse(
-                    symbol=position.get("symbol", ""),
-                    quantity=position.get("qty", 0),
-                    average_price=position.get("avgPrice", 0),
-                    current_price=position.get("currentPrice", 0),
-                    pnl=position.get("pl", 0),
-                    pnl_percentage=position.get("plPercent", 0)
-                ))
-        
-        return positions
+        # Fields are read from our own Fyers response, so skip per-instance validation
+        return [
+            PositionResponse.model_construct(
+                symbol=position.get("symbol", ""),
+                quantity=position.get("qty", 0),
+                average_price=position.get("avgPrice", 0),
+                current_price=position.get("currentPrice", 0),
+                pnl=position.get("pl", 0),
+                pnl_percentage=position.get("plPercent", 0)
+            )
+            for position in positions_data.get("data") or []
+        ]
         
     except FyersAPIError as e:
         logger.error(f"Fyers API error: {e}")
@@ -163,19 +163,12 @@ async def get_positions(current_user: User = Depends(get_current_active_user)):
 
 
 @router.get("/holdings")
-async def get_holdings(current_user: User = Depends(get_current_active_user)):
+async def get_holdings(fyers_client: FyersClient = Depends(get_fyers_client)):
     """Get current holdings."""
     try:
-        if not current_user.has_fyers_credentials():
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="No valid Fyers credentials found"
-            )
-        
-        fyers_client = FyersClient(current_user.fyers_access_token)
         holdings = await fyers_client.get_holdings()
         
-        return holdings
+        return ORJSONResponse(holdings)
         
     except FyersAPIError as e:
         logger.error(f"Fyers API error: {e}")
@@ -191,82 +184,118 @@ async def get_holdings(current_user: User = Depends(get_current_active_user)):
         )
 
 
+def _market_order_call(fyers_client: FyersClient, order_request: OrderRequest) -> Awaitable[Dict[str, Any]]:
+    """Build the Fyers call for a market order."""
+    return fyers_client.place_market_order(
+        symbol=order_request.symbol,
+        side=order_request.side,
+        quantity=order_request.quantity,
+        product_type=order_request.product_type
+    )
+
+
+def _limit_order_call(fyers_client: FyersClient, order_request: OrderRequest) -> Awaitable[Dict[str, Any]]:
+    """Build the Fyers call for a limit order."""
+    if not order_request.price:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Price is required for limit orders"
+        )
+    return fyers_client.place_limit_order(
+        symbol=order_request.symbol,
+        side=order_request.side,
+        quantity=order_request.quantity,
+        price=order_request.price,
+        product_type=order_request.product_type
+    )
+
+
+# Order call builders by lowercased order type; they validate synchronously and
+# return the un-awaited call, so a rejected request never starts the trade insert
+_ORDER_CALLS: Dict[str, Callable[[FyersClient, OrderRequest], Awaitable[Dict[str, Any]]]] = {
+    "market": _market_order_call,
+    "limit": _limit_order_call,
+}
+
+
 @router.post("/orders", response_model=OrderResponse)
 async def place_order(
     order_request: OrderRequest,
     current_user: User = Depends(get_current_active_user),
+    fyers_client: FyersClient = Depends(get_fyers_client),
     db: AsyncSession = Depends(get_db)
 ):
     """Place a new order."""
     try:
-        if not current_user.has_fyers_credentials():
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="No valid Fyers credentials found"
-            )
+        side = OrderSide(order_request.side.lower())
+        order_type = order_request.order_type.lower()
         
-        fyers_client = FyersClient(current_user.fyers_access_token)
-        
-        # Place order based on type
-        if order_request.order_type.lower() == "market":
-            order_response = await fyers_client.place_market_order(
-                symbol=order_request.symbol,
-                side=order_request.side,
-                quantity=order_request.quantity,
-                product_type=order_request.product_type
-            )
-        elif order_request.order_type.lower() == "limit":
-            if not order_request.price:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="Price is required for limit orders"
-                )
-            order_response = await fyers_client.place_limit_order(
-                symbol=order_request.symbol,
-                side=order_request.side,
-                quantity=order_request.quantity,
-                price=order_request.price,
-                product_type=order_request.product_type
-            )
-        else:
+        build_order_call = _ORDER_CALLS.get(order_type)
+        if build_order_call is None:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Invalid order type"
             )
+        order_call = build_order_call(fyers_client, order_request)
+        
+        # Write the pending trade record while the order is in flight
+        trade_id = uuid7()
+        insert_call = db.execute(INSERT_TRADE, {
+            "id": trade_id,
+            "user_id": current_user.id,
+            "symbol": order_request.symbol,
+            "exchange": "NSE",  # Default exchange
+            "side": side,
+            "order_type": OrderType(order_type),
+            "quantity": order_request.quantity,
+            "price": order_request.price,
+            "status": TradeStatus.PENDING,
+            "created_at": datetime.utcnow()
+        })
+        
+        # Let the order call finish even if the insert fails, so a placed order is never abandoned
+        insert_result, order_response = await asyncio.gather(insert_call, order_call, return_exceptions=True)
+        if isinstance(insert_result, BaseException):
+            if not isinstance(order_response, BaseException):
+                logger.error(f"Order placed but trade record failed for user {current_user.id}: {order_response}")
+            raise insert_result
+        
+        if isinstance(order_response, BaseException):
+            # Compensate: keep the record, marked as failed
+            await db.execute(
+                update(Trade).where(Trade.id == trade_id).values(
+                    status=TradeStatus.FAILED,
+                    fyers_message=str(order_response),
+                    updated_at=datetime.utcnow()
+                )
+            )
+            await db.commit()
+            raise order_response
         
-        # Create trade record
-        trade = Trade(
-            user_id=current_user.id,
-            symbol=order_request.symbol,
-            exchange="NSE",  # Default exchange
-            side=order_request.side.upper(),
-            order_type=order_request.order_type,
-            quantity=order_request.quantity,
-            price=order_request.price,
-            status=TradeStatus.SUBMITTED,
-            submitted_at=datetime.utcnow(),
-            created_at=datetime.utcnow()
-        )
-        
+        trade_values = {"status": TradeStatus.SUBMITTED, "submitted_at": datetime.utcnow()}
         if order_response.get("data"):
             order_data = order_response["data"]
-            trade.fyers_order_id = order_data.get("id")
-            trade.fyers_status = order_data.get("status")
-            trade.fyers_message = order_response.get("message")
+            trade_values["fyers_order_id"] = order_data.get("id")
+            trade_values["fyers_status"] = order_data.get("status")
+            trade_values["fyers_message"] = order_response.get("message")
         
-        db.add(trade)
+        await db.execute(
+            update(Trade).where(Trade.id == trade_id).values(updated_at=trade_values["submitted_at"], **trade_values)
+        )
         await db.commit()
-        await db.refresh(trade)
         
-        logger.info(f"Order placed: {order_request.symbol} {order_request.side} {order_request.quantity}")
+        # Arguments are only formatted if a sink accepts INFO
+        logger.info("Order placed: {} {} {}", order_request.symbol, order_request.side, order_request.quantity)
         
         return OrderResponse(
             success=True,
             message="Order placed successfully",
-            order_id=trade.fyers_order_id,
-            trade_id=trade.id
+            order_id=trade_values.get("fyers_order_id"),
+            trade_id=trade_id
         )
         
+    except HTTPException:
+        raise
     except FyersAPIError as e:
         logger.error(f"Fyers API error: {e}")
         raise HTTPException(
@@ -284,20 +313,13 @@ async def place_order(
 @router.get("/orders")
 async def get_orders(
     order_id: Optional[str] = None,
-    current_user: User = Depends(get_current_active_user)
+    fyers_client: FyersClient = Depends(get_fyers_client)
 ):
     """Get order details."""
     try:
-        if not current_user.has_fyers_credentials():
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="No valid Fyers credentials found"
-            )
-        
-        fyers_client = FyersClient(current_user.fyers_access_token)
         orders = await fyers_client.get_orders(order_id)
         
-        return orders
+        return ORJSONResponse(orders)
         
     except FyersAPIError as e:
         logger.error(f"Fyers API error: {e}")
@@ -316,22 +338,15 @@ async def get_orders(
 @router.delete("/orders/{order_id}")
 async def cancel_order(
     order_id: str,
-    current_user: User = Depends(get_current_active_user)
+    fyers_client: FyersClient = Depends(get_fyers_client)
 ):
     """Cancel an order."""
     try:
-        if not current_user.has_fyers_credentials():
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="No valid Fyers credentials found"
-            )
-        
-        fyers_client = FyersClient(current_user.fyers_access_token)
         response = await fyers_client.cancel_order(order_id)
         
-        logger.info(f"Order cancelled: {order_id}")
+        logger.info("Order cancelled: {}", order_id)
         
-        return response
+        return ORJSONResponse(response)
         
     except FyersAPIError as e:
         logger.error(f"Fyers API error: {e}")
@@ -350,21 +365,19 @@ async def cancel_order(
 @router.get("/quotes")
 async def get_quotes(
     symbols: str,
-    current_user: User = Depends(get_current_active_user)
+    fyers_client: FyersClient = Depends(get_fyers_client)
 ):
     """Get quotes for symbols."""
     try:
-        if not current_user.has_fyers_credentials():
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="No valid Fyers credentials found"
-            )
-        
         symbol_list = [s.strip() for s in symbols.split(",")]
-        fyers_client = FyersClient(current_user.fyers_access_token)
-        quotes = await fyers_client.get_quotes(symbol_list)
+        # Keyed per token so one user's result or auth error is never served to another
+        quotes = await cached(
+            ("quotes", fyers_client.access_token, tuple(sorted(symbol_list))),
+            QUOTES_TTL,
+            lambda: fyers_client.get_quotes(symbol_list)
+        )
         
-        return quotes
+        return ORJSONResponse(quotes)
         
     except FyersAPIError as e:
         logger.error(f"Fyers API error: {e}")
@@ -384,10 +397,13 @@ async def get_quotes(
 async def get_market_status(current_user: User = Depends(get_current_active_user)):
     """Get market status."""
     try:
-        fyers_client = FyersClient()
-        status_data = await fyers_client.get_market_status()
+        status_data = await cached(
+            "market_status",
+            MARKET_STATUS_TTL,
+            get_shared_client().get_market_status
+        )
         
-        return status_data
+        return ORJSONResponse(status_data)
         
     except FyersAPIError as e:
         logger.error(f"Fyers API error: {e}")
@@ -2,117 +2,125 @@
 Health check and monitoring routes.
 """
 
+import asyncio
 from datetime import datetime
 from typing import Dict, Any
 
 from fastapi import APIRouter, Depends
+from fastapi.responses import ORJSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import text
 from loguru import logger
 
 from app.db import get_db
 from app.redis_client import redis_client
-from app.services.fyers_client import FyersClient
+from app.services.fyers_client import get_shared_client
 from app.config import settings
 
 router = APIRouter()
 
 
+# Static parts of the polled health and status bodies, built once
+_HEALTH_INFO = {
+    "version": settings.app_version,
+    "environment": settings.environment
+}
+_STATUS_INFO = {
+    "application": settings.app_name,
+    "version": settings.app_version,
+    "environment": settings.environment,
+    "status": "running"
+}
+_APPLICATION_INFO = {
+    "version": settings.app_version,
+    "environment": settings.environment,
+    "debug": settings.debug
+}
+_METRIC_QUEUES = ["trade_execution", "alert_processing"]
+
+
 @router.get("/")
 async def health_check():
     """Basic health check endpoint."""
-    return {
+    # Returned directly so FastAPI skips jsonable_encoder on this frequently polled route
+    return ORJSONResponse({
         "status": "healthy",
         "timestamp": datetime.utcnow().isoformat(),
-        "version": settings.app_version,
-        "environment": settings.environment
-    }
+        **_HEALTH_INFO
+    })
 
 
-@router.get("/detailed")
-async def detailed_health_check(db: AsyncSession = Depends(get_db)):
-    """Detailed health check with all dependencies."""
-    health_status = {
-        "status": "healthy",
-        "timestamp": datetime.utcnow().isoformat(),
-        "version": settings.app_version,
-        "environment": settings.environment,
-        "checks": {}
-    }
-    
-    # Database check
+async def _check_database(db: AsyncSession) -> Dict[str, Any]:
+    """Probe the database with a trivial query."""
     try:
         await db.execute(text("SELECT 1"))
-        health_status["checks"]["database"] = {
+        return {
             "status": "healthy",
             "message": "Database connection successful"
         }
     except Exception as e:
-        health_status["checks"]["database"] = {
+        return {
             "status": "unhealthy",
             "message": f"Database connection failed: {str(e)}"
         }
-        health_status["status"] = "unhealthy"
-    
-    # Redis check
+
+
+async def _check_redis() -> Dict[str, Any]:
+    """Probe Redis."""
     try:
-        redis_health = await redis_client.health_check()
-        health_status["checks"]["redis"] = redis_health
-        if redis_health["status"] != "healthy":
-            health_status["status"] = "unhealthy"
+        return await redis_client.health_check()
     except Exception as e:
-        health_status["checks"]["redis"] = {
+        return {
             "status": "unhealthy",
             "message": f"Redis connection failed: {str(e)}"
         }
-        health_status["status"] = "unhealthy"
-    
-    # Fyers API check
+
+
+async def _check_fyers() -> Dict[str, Any]:
+    """Probe the Fyers API."""
     try:
-        fyers_client = FyersClient()
-        fyers_health = await fyers_client.health_check()
-        health_status["checks"]["fyers_api"] = fyers_health
-        if fyers_health["status"] != "healthy":
-            health_status["status"] = "unhealthy"
+        return await get_shared_client().health_check()
     except Exception as e:
-        health_status["checks"]["fyers_api"] = {
+        return {
             "status": "unhealthy",
             "message": f"Fyers API check failed: {str(e)}"
         }
-        health_status["status"] = "unhealthy"
+
+
+@router.get("/detailed")
+async def detailed_health_check(db: AsyncSession = Depends(get_db)):
+    """Detailed health check with all dependencies."""
+    # Probes run concurrently, so latency is that of the slowest dependency
+    database, redis, fyers_api = await asyncio.gather(
+        _check_database(db), _check_redis(), _check_fyers()
+    )
+    checks = {
+        "database": database,
+        "redis": redis,
+        "fyers_api": fyers_api
+    }
     
-    return health_status
+    return {
+        "status": "healthy" if all(check["status"] == "healthy" for check in checks.values()) else "unhealthy",
+        "timestamp": datetime.utcnow().isoformat(),
+        "version": settings.app_version,
+        "environment": settings.environment,
+        "checks": checks
+    }
 
 
 @router.get("/metrics")
 async def get_metrics():
     """Get application metrics."""
     try:
-        # Get Redis metrics
-        redis_health = await redis_client.health_check()
+        # Redis info and both queue sizes in a single pipelined round-trip
+        snapshot = await redis_client.get_metrics_snapshot(_METRIC_QUEUES)
         
-        # Get queue sizes
-        trade_queue_size = await redis_client.get_queue_size("trade_execution")
-        alert_queue_size = await redis_client.get_queue_size("alert_processing")
-        
-        return {
+        return ORJSONResponse({
             "timestamp": datetime.utcnow().isoformat(),
-            "redis": {
-                "status": redis_health.get("status"),
-                "uptime": redis_health.get("uptime"),
-                "connected_clients": redis_health.get("connected_clients"),
-                "used_memory": redis_health.get("used_memory")
-            },
-            "queues": {
-                "trade_execution": trade_queue_size,
-                "alert_processing": alert_queue_size
-            },
-            "application": {
-                "version": settings.app_version,
-                "environment": settings.environment,
-                "debug": settings.debug
-            }
-        }
+            **snapshot,
+            "application": _APPLICATION_INFO
+        })
         
     except Exception as e:
         logger.error(f"Error getting metrics: {e}")
@@ -125,11 +133,8 @@ async def get_metrics():
 @router.get("/status")
 async def get_status():
     """Get application status."""
-    return {
-        "application": settings.app_name,
-        "version": settings.app_version,
-        "environment": settings.environment,
-        "status": "running",
+    return ORJSONResponse({
+        **_STATUS_INFO,
         "timestamp": datetime.utcnow().isoformat(),
         "uptime": "N/A"  # Could be calculated if needed
-    }
+    })
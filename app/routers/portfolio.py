@@ -15,6 +15,7 @@ from loguru import logger
 from app.db import get_db
 from app.models import User, Portfolio, Trade, TradeStatus
 from app.routers.auth import get_current_active_user
+from app.services.fyers_client import get_client_for_token
 
 router = APIRouter()
 
@@ -339,28 +340,19 @@ async def refresh_portfolio(
                 detail="No valid Fyers credentials found"
             )
         
-        from app.services.fyers_client import FyersClient
-        
-        fyers_client = FyersClient(current_user.fyers_access_token)
+        fyers_client = await get_client_for_token(current_user.fyers_access_token)
         
         # Get current positions from Fyers
         positions_data = await fyers_client.get_positions()
         
         if positions_data.get("data"):
-            for position_data in positions_data["data"]:
-                symbol = position_data.get("symbol", "")
-                current_price = position_data.get("currentPrice", 0)
-                
-                # Update portfolio position
-                portfolio_query = select(Portfolio).where(
-                    Portfolio.user_id == current_user.id,
-                    Portfolio.symbol == symbol
-                )
-                portfolio_result = await db.execute(portfolio_query)
-                portfolio = portfolio_result.scalar_one_or_none()
-                
-                if portfolio:
-                    portfolio.update_current_price(current_price)
+            prices = {
+                position_data.get("symbol", ""): position_data.get("currentPrice", 0)
+                for position_data in positions_data["data"]
+            }
+            
+            # Update all portfolio positions in one statement
+            await Portfolio.bulk_update_prices(db, prices, user_id=current_user.id)
         
         await db.commit()
         
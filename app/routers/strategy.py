@@ -9,12 +9,13 @@ from typing import Dict, Any, List, Optional
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, update, delete
+from sqlalchemy.orm import selectinload
 from pydantic import BaseModel, Field
 from loguru import logger
 
 from app.db import get_db
-from app.models import User, Strategy, Trade
-from app.routers.auth import get_current_active_user
+from app.models import Strategy, Trade
+from app.routers.auth import AuthenticatedUser, get_authenticated_user
 
 router = APIRouter()
 
@@ -90,7 +91,7 @@ class StrategyListResponse(BaseModel):
 @router.post("/", response_model=StrategyResponse, status_code=status.HTTP_201_CREATED)
 async def create_strategy(
     strategy_data: StrategyCreate,
-    current_user: User = Depends(get_current_active_user),
+    current_user: AuthenticatedUser = Depends(get_authenticated_user),
     db: AsyncSession = Depends(get_db)
 ):
     """Create a new trading strategy."""
@@ -132,7 +133,6 @@ async def create_strategy(
         
         db.add(strategy)
         await db.commit()
-        await db.refresh(strategy)
         
         logger.info(f"Strategy created: {strategy.name} for user {current_user.email}")
         
@@ -180,7 +180,7 @@ async def get_strategies(
     skip: int = 0,
     limit: int = 100,
     active_only: bool = False,
-    current_user: User = Depends(get_current_active_user),
+    current_user: AuthenticatedUser = Depends(get_authenticated_user),
     db: AsyncSession = Depends(get_db)
 ):
     """Get user's trading strategies."""
@@ -243,7 +243,7 @@ async def get_strategies(
 @router.get("/{strategy_id}", response_model=StrategyResponse)
 async def get_strategy(
     strategy_id: uuid.UUID,
-    current_user: User = Depends(get_current_active_user),
+    current_user: AuthenticatedUser = Depends(get_authenticated_user),
     db: AsyncSession = Depends(get_db)
 ):
     """Get a specific strategy."""
@@ -304,7 +304,7 @@ async def get_strategy(
 async def update_strategy(
     strategy_id: uuid.UUID,
     strategy_data: StrategyUpdate,
-    current_user: User = Depends(get_current_active_user),
+    current_user: AuthenticatedUser = Depends(get_authenticated_user),
     db: AsyncSession = Depends(get_db)
 ):
     """Update a strategy."""
@@ -330,7 +330,6 @@ async def update_strategy(
         strategy.updated_at = datetime.utcnow()
         
         await db.commit()
-        await db.refresh(strategy)
         
         logger.info(f"Strategy updated: {strategy.name}")
         
@@ -376,12 +375,13 @@ async def update_strategy(
 @router.delete("/{strategy_id}")
 async def delete_strategy(
     strategy_id: uuid.UUID,
-    current_user: User = Depends(get_current_active_user),
+    current_user: AuthenticatedUser = Depends(get_authenticated_user),
     db: AsyncSession = Depends(get_db)
 ):
     """Delete a strategy."""
     try:
-        strategy_query = select(Strategy).where(
+        # Trades are deleted by cascade, so load them up front
+        strategy_query = select(Strategy).options(selectinload(Strategy.trades)).where(
             Strategy.id == strategy_id,
             Strategy.user_id == current_user.id
         )
@@ -416,7 +416,7 @@ async def get_strategy_trades(
     strategy_id: uuid.UUID,
     skip: int = 0,
     limit: int = 100,
-    current_user: User = Depends(get_current_active_user),
+    current_user: AuthenticatedUser = Depends(get_authenticated_user),
     db: AsyncSession = Depends(get_db)
 ):
     """Get trades for a specific strategy."""
@@ -474,7 +474,7 @@ async def get_strategy_trades(
 @router.post("/{strategy_id}/activate")
 async def activate_strategy(
     strategy_id: uuid.UUID,
-    current_user: User = Depends(get_current_active_user),
+    current_user: AuthenticatedUser = Depends(get_authenticated_user),
     db: AsyncSession = Depends(get_db)
 ):
     """Activate a strategy."""
@@ -514,7 +514,7 @@ async def activate_strategy(
 @router.post("/{strategy_id}/deactivate")
 async def deactivate_strategy(
     strategy_id: uuid.UUID,
-    current_user: User = Depends(get_current_active_user),
+    current_user: AuthenticatedUser = Depends(get_authenticated_user),
     db: AsyncSession = Depends(get_db)
 ):
     """Deactivate a strategy."""
@@ -0,0 +1,43 @@
+"""
+Fan-out of Chartlink alerts to every active user.
+"""
+
+import uuid
+from typing import Any, Dict, List
+
+from sqlalchemy import func, literal, select
+from sqlalchemy.dialects.postgresql import ARRAY, UUID, insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import Alert
+from app.services.user_cache import get_active_user_ids
+
+# Verified webhook signals waiting for their per-user alert rows
+SIGNAL_QUEUE = "chartlink_signals"
+
+
+def build_fanout_insert(alert_fields: Dict[str, Any], user_ids: List[uuid.UUID]):
+    """INSERT ... SELECT over unnest(user_ids): one row per user from a single set of bound values."""
+    fields = {"updated_at": alert_fields["created_at"], **alert_fields}
+    columns = [Alert.id, Alert.user_id]
+    values = [func.gen_random_uuid(), func.unnest(literal(user_ids, ARRAY(UUID(as_uuid=True))))]
+    for key, value in fields.items():
+        attribute = getattr(Alert, key)
+        columns.append(attribute)
+        values.append(literal(value, attribute.type))
+    
+    return pg_insert(Alert).from_select(columns, select(*values)).on_conflict_do_nothing(
+        index_elements=["external_id", "user_id"]
+    ).returning(Alert.id)
+
+
+async def insert_alerts_for_active_users(db: AsyncSession, alert_fields: Dict[str, Any]) -> List[uuid.UUID]:
+    """Insert one alert per active user, skipping users already alerted for this external id."""
+    user_ids = await get_active_user_ids(db)
+    if not user_ids:
+        return []
+    
+    # The shared fields (including the metadata JSONB) are sent and encoded once,
+    # not once per row, so cost barely grows with the number of users
+    result = await db.execute(build_fanout_insert(alert_fields, user_ids))
+    return result.scalars().all()
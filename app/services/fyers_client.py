@@ -4,6 +4,7 @@ Fyers API client for trading operations and market data.
 
 import asyncio
 import json
+from collections import OrderedDict
 from datetime import datetime, timedelta
 from typing import Dict, Any, List, Optional, Union
 from urllib.parse import urlencode
@@ -328,3 +329,73 @@ class FyersClient:
                 "error": str(e),
                 "timestamp": datetime.utcnow().isoformat()
             }
+
+
+# Process-wide client for calls that carry no user access token, so the
+# underlying connection pool (and its TLS sessions) survives across requests
+_shared_client: Optional[FyersClient] = None
+
+
+def get_shared_client() -> FyersClient:
+    """Get the shared token-less Fyers client, creating it on first use."""
+    global _shared_client
+    if _shared_client is None:
+        _shared_client = FyersClient()
+    return _shared_client
+
+
+async def close_shared_client():
+    """Close the shared Fyers client if it was created."""
+    global _shared_client
+    if _shared_client is not None:
+        await _shared_client.close()
+        _shared_client = None
+
+
+# Per-access-token clients for user-scoped routes, kept in LRU order so a busy
+# user's keep-alive connections are reused instead of rebuilt on every request
+TOKEN_CLIENT_CACHE_SIZE = 1024
+_token_clients: "OrderedDict[str, FyersClient]" = OrderedDict()
+
+# Evicted clients may still be serving in-flight calls (30s timeout, 3 attempts
+# with backoff), so they are closed only after this grace period
+EVICTED_CLIENT_GRACE_SECONDS = 120.0
+_pending_closes: Dict[asyncio.Task, FyersClient] = {}
+
+
+async def _close_after_grace(client: FyersClient):
+    """Close an evicted client once in-flight calls on it have had time to finish."""
+    await asyncio.sleep(EVICTED_CLIENT_GRACE_SECONDS)
+    await client.close()
+
+
+async def get_client_for_token(access_token: str) -> FyersClient:
+    """Get the cached Fyers client for an access token, creating it on first use."""
+    client = _token_clients.get(access_token)
+    if client is not None:
+        _token_clients.move_to_end(access_token)
+        return client
+    
+    client = FyersClient(access_token)
+    _token_clients[access_token] = client
+    if len(_token_clients) > TOKEN_CLIENT_CACHE_SIZE:
+        _, evicted = _token_clients.popitem(last=False)
+        close_task = asyncio.create_task(_close_after_grace(evicted))
+        _pending_closes[close_task] = evicted
+        close_task.add_done_callback(lambda done: _pending_closes.pop(done, None))
+    return client
+
+
+async def close_token_clients():
+    """Close every cached per-token Fyers client, including evicted ones awaiting close."""
+    clients = list(_token_clients.values())
+    _token_clients.clear()
+    for client in clients:
+        await client.close()
+    
+    # Skip the grace period for evicted clients and close them now
+    pending = list(_pending_closes.items())
+    _pending_closes.clear()
+    for close_task, client in pending:
+        close_task.cancel()
+        await client.close()
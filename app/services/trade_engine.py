@@ -11,7 +11,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, update
 from loguru import logger
 
-from app.models import User, Strategy, Trade, Alert, Portfolio, TradeStatus, OrderSide
+from app.models import User, Strategy, Trade, Alert, AlertStatus, Portfolio, TradeStatus, OrderSide
 from app.services.fyers_client import FyersClient, FyersAPIError
 from app.redis_client import redis_client
 from app.config import settings
@@ -118,7 +118,7 @@ class TradeEngine:
                 return True
             
             # Check if this is a scan alert (informational only, no trade execution)
-            if alert.metadata.get("is_scan_alert"):
+            if alert.extra_metadata.get("is_scan_alert"):
                 logger.info(f"Alert {alert_id} is a scan alert, skipping trade processing")
                 alert.mark_as_ignored("Scan alert - informational only")
                 await db.commit()
@@ -176,9 +176,10 @@ class TradeEngine:
         except Exception as e:
             logger.error(f"Failed to process alert {alert_id}: {e}")
             try:
-                alert.mark_as_failed(str(e))
+                await db.rollback()
+                await Alert.set_status(db, alert_id, AlertStatus.FAILED, error_message=str(e))
                 await db.commit()
-            except:
+            except Exception:
                 pass
             return False
     
@@ -272,6 +273,7 @@ class TradeEngine:
                 
                 # Update strategy metrics
                 strategy.total_trades += 1
+                strategy.refresh_win_rate()
                 strategy.last_executed_at = datetime.utcnow()
                 
                 logger.info(f"Successfully executed trade {trade.id}")
@@ -0,0 +1,50 @@
+"""
+Short-lived in-process cache for upstream API responses.
+"""
+
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+MAX_ENTRIES = 1024
+
+_entries: Dict[Hashable, Tuple[float, asyncio.Future]] = {}
+
+
+def _drop_failed(key: Hashable, task: asyncio.Future):
+    """Forget a fetch that failed so the next caller retries instead of reusing the error."""
+    if not task.cancelled() and task.exception() is None:
+        return
+    entry = _entries.get(key)
+    if entry is not None and entry[1] is task:
+        del _entries[key]
+
+
+def _prune(now: float):
+    """Drop expired entries once the cache grows past its bound."""
+    for key in [key for key, (expires_at, _) in _entries.items() if expires_at <= now]:
+        del _entries[key]
+
+
+async def cached(key: Hashable, ttl: float, coro_factory: Callable[[], Awaitable[Any]]) -> Any:
+    """Get the result for key, sharing one in-flight fetch between concurrent callers."""
+    now = time.monotonic()
+    entry = _entries.get(key)
+    if entry is not None and entry[0] > now:
+        task = entry[1]
+    else:
+        if len(_entries) >= MAX_ENTRIES:
+            _prune(now)
+        
+        # A task rather than a bare coroutine, so a disconnecting caller
+        # cannot cancel the fetch the other waiters are sharing
+        task = asyncio.ensure_future(coro_factory())
+        task.add_done_callback(lambda done: _drop_failed(key, done))
+        _entries[key] = (now + ttl, task)
+    
+    return await asyncio.shield(task)
+
+
+def clear():
+    """Drop every cached entry."""
+    _entries.clear()
@@ -0,0 +1,35 @@
+"""
+Redis-backed cache of active user ids for webhook fan-out.
+"""
+
+import uuid
+from typing import List
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import User
+from app.redis_client import redis_client
+
+ACTIVE_USER_IDS_KEY = "active_user_ids"
+ACTIVE_USER_IDS_TTL = 60
+
+
+async def get_active_user_ids(db: AsyncSession) -> List[uuid.UUID]:
+    """Get ids of all active users, from cache when fresh."""
+    cached = await redis_client.get_cache(ACTIVE_USER_IDS_KEY)
+    if cached is not None:
+        return [uuid.UUID(user_id) for user_id in cached]
+    
+    result = await db.execute(select(User.id).where(User.is_active == True))
+    user_ids = list(result.scalars().all())
+    # The caller already has the ids, so the webhook path doesn't wait on the cache write
+    await redis_client.set_cache(
+        ACTIVE_USER_IDS_KEY, user_ids, expire_seconds=ACTIVE_USER_IDS_TTL, fire_and_forget=True
+    )
+    return user_ids
+
+
+async def invalidate_active_user_ids():
+    """Drop the cached id list after a user is created or (de)activated."""
+    await redis_client.delete_cache(ACTIVE_USER_IDS_KEY)
@@ -0,0 +1,37 @@
+"""
+Tests for Chartlink webhook handling.
+"""
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from app.redis_client import redis_client
+from app.routers.chartlink import _handle_scan_payload, generate_idempotency_key
+
+
+SCAN_PAYLOAD = {
+    "stocks": "RELIANCE,TCS",
+    "trigger_prices": "2500.5,3500.25",
+    "triggered_at": "2:34 pm",
+    "scan_name": "Short term breakouts",
+    "scan_url": "short-term-breakouts",
+    "alert_name": "Alert for Short term breakouts"
+}
+
+
+@pytest.mark.asyncio
+async def test_scan_without_new_alerts_releases_replay_guard():
+    """Test a scan that stores nothing does not block the next fire as a duplicate."""
+    db = AsyncMock()
+    db.add = MagicMock()
+    replay_key = f"idemp:{generate_idempotency_key(SCAN_PAYLOAD)}"
+    
+    with patch.object(redis_client, "set_nx", AsyncMock(return_value=True)), \
+         patch.object(redis_client, "delete_cache", AsyncMock(return_value=True)) as delete_cache, \
+         patch("app.routers.chartlink.insert_alerts_for_active_users", AsyncMock(return_value=[])):
+        response = await _handle_scan_payload(dict(SCAN_PAYLOAD), db)
+    
+    assert response.success is False
+    db.rollback.assert_awaited_once()
+    db.commit.assert_not_awaited()
+    delete_cache.assert_awaited_once_with(replay_key)
@@ -6,6 +6,7 @@ import pytest
 from unittest.mock import AsyncMock, patch
 import httpx
 
+from app.services import fyers_client
 from app.services.fyers_client import FyersClient, FyersAPIError
 
 
@@ -283,3 +284,17 @@ async def test_fyers_client_close():
     with patch.object(client._client, 'aclose') as mock_close:
         await client.close()
         mock_close.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_evicted_token_client_stays_open_for_in_flight_calls():
+    """Test an evicted per-token client is closed only after the grace period or on shutdown."""
+    with patch.object(fyers_client, "TOKEN_CLIENT_CACHE_SIZE", 1):
+        first = await fyers_client.get_client_for_token("token-a")
+        await fyers_client.get_client_for_token("token-b")
+        
+        # token-a was evicted but may still be in use by a request holding it
+        assert not first._client.is_closed
+        
+        await fyers_client.close_token_clients()
+        assert first._client.is_closed
@@ -0,0 +1,79 @@
+"""
+Tests for portfolio position calculations.
+"""
+
+import pytest
+from datetime import datetime
+
+from app.models import Portfolio
+
+
+def make_position(**kwargs) -> Portfolio:
+    """Create an unsaved position with zeroed counters."""
+    defaults = {
+        "symbol": "RELIANCE",
+        "exchange": "NSE",
+        "quantity": 0,
+        "realized_pnl": 0.0,
+        "unrealized_pnl": 0.0,
+        "trade_count": 0
+    }
+    defaults.update(kwargs)
+    return Portfolio(**defaults)
+
+
+def test_update_position_open_and_add():
+    """Test opening a position and averaging into it."""
+    position = make_position()
+    
+    position.update_position(10, 100.0, datetime.utcnow())
+    assert position.quantity == 10
+    assert position.average_price == 100.0
+    assert position.invested_amount == 1000.0
+    
+    position.update_position(10, 110.0, datetime.utcnow())
+    assert position.quantity == 20
+    assert position.average_price == 105.0
+    assert position.invested_amount == 2100.0
+    assert position.realized_pnl == 0.0
+    assert position.trade_count == 2
+
+
+def test_update_position_reduce_long():
+    """Test realized P&L when reducing a long position."""
+    position = make_position()
+    position.update_position(10, 100.0, datetime.utcnow())
+    
+    position.update_position(-4, 120.0, datetime.utcnow())
+    assert position.quantity == 6
+    assert position.realized_pnl == 80.0
+    
+    position.update_position(-6, 90.0, datetime.utcnow())
+    assert position.quantity == 0
+    assert position.average_price is None
+    assert position.invested_amount == 0.0
+    assert position.realized_pnl == pytest.approx(100.0)
+
+
+def test_update_position_reduce_short():
+    """Test realized P&L when covering a short position."""
+    position = make_position()
+    position.update_position(-10, 100.0, datetime.utcnow())
+    assert position.average_price == 100.0
+    
+    position.update_position(5, 90.0, datetime.utcnow())
+    assert position.quantity == -5
+    assert position.realized_pnl == 50.0
+
+
+def test_update_current_price():
+    """Test unrealized P&L for long and short positions."""
+    long_position = make_position(quantity=10, average_price=100.0)
+    long_position.update_current_price(110.0)
+    assert long_position.unrealized_pnl == 100.0
+    assert long_position.market_value == 1100.0
+    
+    short_position = make_position(quantity=-10, average_price=100.0)
+    short_position.update_current_price(110.0)
+    assert short_position.unrealized_pnl == -100.0
+    assert short_position.market_value == 1100.0
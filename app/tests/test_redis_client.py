@@ -0,0 +1,29 @@
+"""
+Tests for the Redis client wrapper.
+"""
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from app.redis_client import RedisClient
+
+
+@pytest.mark.asyncio
+async def test_fire_and_forget_cache_writes_share_one_pipeline():
+    """Test fire-and-forget cache writes are flushed together in one pipeline."""
+    client = RedisClient()
+    pipe = MagicMock()
+    pipe.execute = AsyncMock(return_value=[True, True])
+    client._redis = MagicMock()
+    client._redis.pipeline.return_value = pipe
+    client._redis.set = AsyncMock()
+    
+    assert await client.set_cache("a", [1], expire_seconds=60, fire_and_forget=True)
+    assert await client.set_cache("b", {"x": 1}, fire_and_forget=True)
+    await client._cache_flush_task
+    
+    client._redis.set.assert_not_awaited()
+    client._redis.pipeline.assert_called_once_with(transaction=False)
+    assert [call.args[0] for call in pipe.set.call_args_list] == ["a", "b"]
+    assert pipe.set.call_args_list[0].kwargs["ex"] == 60
+    pipe.execute.assert_awaited_once()
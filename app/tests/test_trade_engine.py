@@ -7,7 +7,8 @@ import uuid
 from datetime import datetime
 from unittest.mock import AsyncMock, patch
 
-from app.models import User, Strategy, Alert, Trade, TradeStatus, AlertType, AlertSource
+from app.models import User, Strategy, Alert, Trade, TradeStatus, AlertType, AlertSource, OrderSide, OrderType
+from app.models.trade import mark_to_market
 from app.services.trade_engine import TradeEngine, RiskManager
 from app.tests.conftest import db_session, test_user_data, test_strategy_data, test_alert_data
 
@@ -300,3 +301,35 @@ async def test_strategy_performance_update(db_session, test_user_data, test_stra
     assert strategy.total_pnl == initial_pnl + 50.0
     assert strategy.winning_trades == 1
     assert strategy.losing_trades == 1
+
+
+def test_mark_to_market_matches_calculate_pnl():
+    """Test vectorized mark-to-market against per-trade P&L."""
+    def make_trade(symbol, side, status, filled, avg):
+        return Trade(symbol=symbol, exchange="NSE", side=side, order_type=OrderType.MARKET,
+                     quantity=10, filled_quantity=filled, average_price=avg, status=status)
+    
+    trades = [
+        make_trade("RELIANCE", OrderSide.BUY, TradeStatus.FILLED, 10, 100.0),
+        make_trade("TCS", OrderSide.SELL, TradeStatus.FILLED, 10, 200.0),
+        make_trade("INFY", OrderSide.BUY, TradeStatus.PARTIALLY_FILLED, 5, 50.0),
+        make_trade("HDFC", OrderSide.BUY, TradeStatus.FILLED, 10, None),
+    ]
+    prices = {"RELIANCE": 110.0, "TCS": 190.0, "INFY": 60.0, "HDFC": 10.0}
+    
+    result = mark_to_market(trades, prices)
+    
+    assert result.tolist() == [trade.calculate_pnl(prices[trade.symbol]) for trade in trades]
+    assert result.tolist() == [100.0, 100.0, 0.0, 0.0]
+
+
+def test_status_flags_without_status():
+    """Test status checks on a trade whose status is not set yet."""
+    trade = Trade(symbol="RELIANCE")
+    
+    assert trade.status_flags == 0
+    assert trade.is_pending is False
+    assert trade.is_cancelled is False
+    
+    trade.status = TradeStatus.SUBMITTED
+    assert trade.is_pending is True
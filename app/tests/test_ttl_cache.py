@@ -0,0 +1,64 @@
+"""
+Tests for the in-process TTL cache.
+"""
+
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+import orjson
+import pytest
+
+from app.routers.fyers import get_quotes
+from app.services import ttl_cache
+
+
+@pytest.mark.asyncio
+async def test_cached_shares_one_fetch():
+    """Test concurrent callers share a single upstream fetch."""
+    ttl_cache.clear()
+    calls = 0
+    
+    async def fetch():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return {"calls": calls}
+    
+    results = await asyncio.gather(*[ttl_cache.cached("key", 5.0, fetch) for _ in range(5)])
+    
+    assert calls == 1
+    assert all(result == {"calls": 1} for result in results)
+
+
+@pytest.mark.asyncio
+async def test_cached_does_not_keep_errors():
+    """Test a failed fetch is retried by the next caller."""
+    ttl_cache.clear()
+    
+    async def fail():
+        raise ValueError("upstream down")
+    
+    async def succeed():
+        return "ok"
+    
+    with pytest.raises(ValueError):
+        await ttl_cache.cached("key", 5.0, fail)
+    
+    assert await ttl_cache.cached("key", 5.0, succeed) == "ok"
+
+
+@pytest.mark.asyncio
+async def test_quotes_are_not_shared_between_tokens():
+    """Test cached quotes are scoped to the caller's access token."""
+    ttl_cache.clear()
+    
+    def client_for(token):
+        client = MagicMock(access_token=token)
+        client.get_quotes = AsyncMock(return_value={"token": token})
+        return client
+    
+    first = await get_quotes("NSE:SBIN-EQ", client_for("token-a"))
+    second = await get_quotes("NSE:SBIN-EQ", client_for("token-b"))
+    
+    assert orjson.loads(first.body) == {"token": "token-a"}
+    assert orjson.loads(second.body) == {"token": "token-b"}
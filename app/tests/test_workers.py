@@ -0,0 +1,75 @@
+"""
+Tests for the background queue workers.
+"""
+
+import time
+
+import msgpack
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from app.redis_client import redis_client
+from app.services.alert_fanout import SIGNAL_QUEUE
+from app.workers import process_signal_task
+
+
+def _signal_task(attempts: int = 0) -> dict:
+    """Build a queued signal task envelope."""
+    return {
+        "id": f"{SIGNAL_QUEUE}:1:1",
+        "data": {
+            "symbol": "RELIANCE",
+            "exchange": "NSE",
+            "alert_type": "buy",
+            "price": 2500.0,
+            "quantity": 1,
+            "message": None,
+            "extra_metadata": {},
+            "external_id": "chartlink_test",
+            "external_source": "chartlink"
+        },
+        "priority": 1,
+        "ts": time.time(),
+        "attempts": attempts,
+        "max_attempts": 3
+    }
+
+
+async def _run_failing_signal(task: dict):
+    """Run a signal task whose fan-out insert fails and return the requeued (key, task)."""
+    db = AsyncMock()
+    redis = MagicMock()
+    redis.zadd = AsyncMock(return_value=1)
+    
+    with patch.object(redis_client, "_redis", redis), \
+         patch("app.workers.insert_alerts_for_active_users", AsyncMock(side_effect=RuntimeError("db down"))):
+        await process_signal_task(task, db)
+    
+    db.rollback.assert_awaited_once()
+    db.commit.assert_not_awaited()
+    redis.zadd.assert_awaited_once()
+    key, mapping = redis.zadd.await_args.args
+    (member,) = mapping
+    return key, msgpack.unpackb(member, raw=False)
+
+
+@pytest.mark.asyncio
+async def test_failed_signal_is_requeued():
+    """Test a signal whose fan-out fails goes back on its queue with the attempt counted."""
+    task = _signal_task()
+    
+    key, requeued = await _run_failing_signal(task)
+    
+    assert key == f"queue:{SIGNAL_QUEUE}"
+    assert requeued["attempts"] == 1
+    assert requeued["data"] == task["data"]
+    assert requeued["ts"] == task["ts"]
+
+
+@pytest.mark.asyncio
+async def test_signal_out_of_attempts_is_dead_lettered():
+    """Test a signal that keeps failing ends on the dead-letter queue."""
+    key, requeued = await _run_failing_signal(_signal_task(attempts=2))
+    
+    assert key == f"queue:{SIGNAL_QUEUE}:dead"
+    assert requeued["attempts"] == 3
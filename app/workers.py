@@ -0,0 +1,140 @@
+"""
+Background queue workers for trade and alert processing.
+
+Runs outside the API process so queue handling never competes with request
+serving on the same event loop:
+
+    python -m app.workers
+"""
+
+import asyncio
+from datetime import datetime
+from typing import Awaitable, Callable
+
+from loguru import logger
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db import AsyncSessionLocal, close_db
+from app.models import AlertSource, AlertStatus, AlertType
+from app.redis_client import redis_client
+from app.services.alert_fanout import SIGNAL_QUEUE, insert_alerts_for_active_users
+from app.services.trade_engine import trade_engine
+
+
+async def consume_queue(queue_name: str, handler: Callable[[dict, AsyncSession], Awaitable[None]]):
+    """Block on a task queue and dispatch tasks in batches sharing one session."""
+    logger.info(f"Background consumer started for queue: {queue_name}")
+    
+    while True:
+        try:
+            tasks = await redis_client.dequeue_batch(queue_name, max_tasks=32, timeout=30)
+            if not tasks:
+                continue
+            
+            async with AsyncSessionLocal() as db:
+                for task in tasks:
+                    await handler(task, db)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Error in background consumer for {queue_name}: {e}")
+            await asyncio.sleep(1)
+
+
+async def process_trade_task(task_data: dict, db: AsyncSession):
+    """Process a trade execution task."""
+    try:
+        trade_id = task_data["data"]["trade_id"]
+        success = await trade_engine.update_trade_status(trade_id, db)
+        
+        if success:
+            logger.info(f"Successfully processed trade task: {trade_id}")
+        else:
+            logger.warning(f"Failed to process trade task: {trade_id}")
+            
+    except Exception as e:
+        logger.error(f"Error processing trade task: {e}")
+        # Keep the shared session usable for the rest of the batch
+        await db.rollback()
+
+
+async def process_alert_task(task_data: dict, db: AsyncSession):
+    """Process an alert processing task."""
+    try:
+        alert_id = task_data["data"]["alert_id"]
+        success = await trade_engine.process_alert(alert_id, db)
+        
+        if success:
+            logger.info(f"Successfully processed alert task: {alert_id}")
+        else:
+            logger.warning(f"Failed to process alert task: {alert_id}")
+            
+    except Exception as e:
+        logger.error(f"Error processing alert task: {e}")
+        await db.rollback()
+
+
+async def process_signal_task(task_data: dict, db: AsyncSession):
+    """Fan a queued Chartlink signal out to per-user alerts and queue them for execution."""
+    try:
+        alert_fields = {
+            **task_data["data"],
+            "alert_type": AlertType(task_data["data"]["alert_type"]),
+            "source": AlertSource.CHARTLINK,
+            "status": AlertStatus.RECEIVED,
+            "created_at": datetime.utcfromtimestamp(task_data["ts"])
+        }
+        alert_ids = await insert_alerts_for_active_users(db, alert_fields)
+        if not alert_ids:
+            # No active users, or a redelivered task whose alerts already exist
+            logger.warning(f"No new alerts created for signal {alert_fields['external_id']}")
+            await db.rollback()
+            return
+        await db.commit()
+        
+        # Enqueue only after commit so an alert worker never sees a missing row
+        if not await redis_client.enqueue_tasks_bulk(
+            "alert_processing",
+            [{"alert_id": str(alert_id)} for alert_id in alert_ids],
+            priority=1  # High priority for real-time signals
+        ):
+            logger.error(f"Failed to enqueue {len(alert_ids)} alerts; they remain in RECEIVED status")
+        
+        logger.info(f"Processed Chartlink signal {alert_fields['symbol']}, created {len(alert_ids)} alerts")
+        
+    except Exception as e:
+        logger.error(f"Error processing signal task: {e}")
+        # The webhook has already answered 200, so the queue owns redelivery; a
+        # retried insert is a no-op for users already alerted (external_id, user_id)
+        await redis_client.retry_task(SIGNAL_QUEUE, task_data)
+        await db.rollback()
+
+
+def start_consumers() -> list:
+    """Start one consumer task per queue on the running event loop."""
+    return [
+        asyncio.create_task(consume_queue("trade_execution", process_trade_task)),
+        asyncio.create_task(consume_queue("alert_processing", process_alert_task)),
+        asyncio.create_task(consume_queue(SIGNAL_QUEUE, process_signal_task)),
+    ]
+
+
+async def run_workers():
+    """Connect to dependencies and run all queue consumers until stopped."""
+    logger.info("Starting AlgoTrader workers...")
+    await redis_client.connect()
+    
+    consumers = start_consumers()
+    try:
+        await asyncio.gather(*consumers)
+    finally:
+        for consumer in consumers:
+            consumer.cancel()
+        await trade_engine.close_all_clients()
+        await redis_client.disconnect()
+        await close_db()
+        logger.info("AlgoTrader workers stopped")
+
+
+if __name__ == "__main__":
+    asyncio.run(run_workers())
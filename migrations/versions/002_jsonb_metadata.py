@@ -0,0 +1,46 @@
+"""Store alert and portfolio metadata as JSONB
+
+Revision ID: 002
+Revises: 001
+Create Date: 2024-01-15 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '002'
+down_revision = '001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.alter_column('alerts', 'metadata',
+               existing_type=sa.JSON(),
+               type_=postgresql.JSONB(),
+               existing_nullable=False,
+               postgresql_using='metadata::jsonb')
+    op.alter_column('portfolios', 'metadata',
+               existing_type=sa.JSON(),
+               type_=postgresql.JSONB(),
+               existing_nullable=False,
+               postgresql_using='metadata::jsonb')
+    op.create_index('ix_alerts_metadata_gin', 'alerts', ['metadata'], unique=False, postgresql_using='gin')
+    op.create_index('ix_portfolios_metadata_gin', 'portfolios', ['metadata'], unique=False, postgresql_using='gin')
+
+
+def downgrade() -> None:
+    op.drop_index('ix_portfolios_metadata_gin', table_name='portfolios')
+    op.drop_index('ix_alerts_metadata_gin', table_name='alerts')
+    op.alter_column('portfolios', 'metadata',
+               existing_type=postgresql.JSONB(),
+               type_=sa.JSON(),
+               existing_nullable=False,
+               postgresql_using='metadata::json')
+    op.alter_column('alerts', 'metadata',
+               existing_type=postgresql.JSONB(),
+               type_=sa.JSON(),
+               existing_nullable=False,
+               postgresql_using='metadata::json')
@@ -0,0 +1,31 @@
+"""Add composite and partial indexes for alert and portfolio lookups
+
+Revision ID: 003
+Revises: 002
+Create Date: 2024-01-15 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '003'
+down_revision = '002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_alerts_user_symbol', 'alerts', ['user_id', 'symbol'], unique=False)
+    op.create_index('ix_alerts_pending', 'alerts', ['created_at'], unique=False,
+                    postgresql_where=sa.text("status = 'RECEIVED'"))
+    op.create_unique_constraint('uq_portfolio_user_symbol', 'portfolios', ['user_id', 'symbol', 'exchange'])
+    op.create_index('ix_portfolio_user_open', 'portfolios', ['user_id'], unique=False,
+                    postgresql_where=sa.text('quantity <> 0'))
+
+
+def downgrade() -> None:
+    op.drop_index('ix_portfolio_user_open', table_name='portfolios')
+    op.drop_constraint('uq_portfolio_user_symbol', 'portfolios', type_='unique')
+    op.drop_index('ix_alerts_pending', table_name='alerts')
+    op.drop_index('ix_alerts_user_symbol', table_name='alerts')
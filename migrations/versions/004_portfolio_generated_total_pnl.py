@@ -0,0 +1,31 @@
+"""Make portfolios.total_pnl a generated column
+
+Revision ID: 004
+Revises: 003
+Create Date: 2024-01-15 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '004'
+down_revision = '003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.drop_column('portfolios', 'total_pnl')
+    op.add_column('portfolios', sa.Column(
+        'total_pnl', sa.Float(),
+        sa.Computed('realized_pnl + unrealized_pnl', persisted=True),
+        nullable=False
+    ))
+
+
+def downgrade() -> None:
+    op.drop_column('portfolios', 'total_pnl')
+    op.add_column('portfolios', sa.Column('total_pnl', sa.Float(), nullable=False, server_default='0'))
+    op.execute('UPDATE portfolios SET total_pnl = realized_pnl + unrealized_pnl')
+    op.alter_column('portfolios', 'total_pnl', server_default=None)
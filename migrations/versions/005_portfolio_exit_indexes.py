@@ -0,0 +1,27 @@
+"""Add partial indexes for stop loss and take profit scans
+
+Revision ID: 005
+Revises: 004
+Create Date: 2024-01-15 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '005'
+down_revision = '004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_portfolio_stop_loss', 'portfolios', ['stop_loss_price'], unique=False,
+                    postgresql_where=sa.text('stop_loss_price IS NOT NULL'))
+    op.create_index('ix_portfolio_take_profit', 'portfolios', ['take_profit_price'], unique=False,
+                    postgresql_where=sa.text('take_profit_price IS NOT NULL'))
+
+
+def downgrade() -> None:
+    op.drop_index('ix_portfolio_take_profit', table_name='portfolios')
+    op.drop_index('ix_portfolio_stop_loss', table_name='portfolios')
@@ -0,0 +1,40 @@
+"""Replace single-column trade indexes with composite and partial ones
+
+Revision ID: 007
+Revises: 005
+Create Date: 2024-01-15 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '007'
+down_revision = '005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.drop_index('ix_trades_symbol', table_name='trades')
+    op.drop_index('ix_trades_fyers_order_id', table_name='trades')
+    op.create_index('ix_trades_user_created', 'trades', ['user_id', 'created_at'], unique=False)
+    op.create_index('ix_trades_user_open', 'trades', ['user_id', 'created_at'], unique=False,
+                    postgresql_where=sa.text("status IN ('PENDING', 'SUBMITTED', 'PARTIALLY_FILLED')"))
+    op.create_index('ix_trades_strategy_created', 'trades', ['strategy_id', 'created_at'], unique=False)
+    op.create_index('ix_trades_strategy_filled', 'trades', ['strategy_id', 'filled_at'], unique=False,
+                    postgresql_where=sa.text("status = 'FILLED'"))
+    op.create_index('ix_trades_symbol_created', 'trades', ['symbol', 'created_at'], unique=False)
+    op.create_index('ix_trades_fyers_order_id', 'trades', ['fyers_order_id'], unique=True,
+                    postgresql_where=sa.text('fyers_order_id IS NOT NULL'))
+
+
+def downgrade() -> None:
+    op.drop_index('ix_trades_fyers_order_id', table_name='trades')
+    op.drop_index('ix_trades_symbol_created', table_name='trades')
+    op.drop_index('ix_trades_strategy_filled', table_name='trades')
+    op.drop_index('ix_trades_strategy_created', table_name='trades')
+    op.drop_index('ix_trades_user_open', table_name='trades')
+    op.drop_index('ix_trades_user_created', table_name='trades')
+    op.create_index('ix_trades_fyers_order_id', 'trades', ['fyers_order_id'], unique=False)
+    op.create_index('ix_trades_symbol', 'trades', ['symbol'], unique=False)
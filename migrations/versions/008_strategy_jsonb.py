@@ -0,0 +1,42 @@
+"""Store strategy configuration as JSONB with containment indexes
+
+Revision ID: 008
+Revises: 007
+Create Date: 2024-01-15 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '008'
+down_revision = '007'
+branch_labels = None
+depends_on = None
+
+JSON_COLUMNS = ('parameters', 'risk_parameters', 'entry_rules', 'exit_rules', 'position_sizing_rules')
+
+
+def upgrade() -> None:
+    for column in JSON_COLUMNS:
+        op.alter_column('strategies', column,
+                   existing_type=sa.JSON(),
+                   type_=postgresql.JSONB(),
+                   existing_nullable=False,
+                   postgresql_using=f'{column}::jsonb')
+    op.create_index('ix_strategies_parameters_gin', 'strategies', ['parameters'], unique=False,
+                    postgresql_using='gin', postgresql_ops={'parameters': 'jsonb_path_ops'})
+    op.create_index('ix_strategies_entry_rules_gin', 'strategies', ['entry_rules'], unique=False,
+                    postgresql_using='gin', postgresql_ops={'entry_rules': 'jsonb_path_ops'})
+
+
+def downgrade() -> None:
+    op.drop_index('ix_strategies_entry_rules_gin', table_name='strategies')
+    op.drop_index('ix_strategies_parameters_gin', table_name='strategies')
+    for column in JSON_COLUMNS:
+        op.alter_column('strategies', column,
+                   existing_type=postgresql.JSONB(),
+                   type_=sa.JSON(),
+                   existing_nullable=False,
+                   postgresql_using=f'{column}::json')
@@ -0,0 +1,25 @@
+"""Store strategy win rate in basis points
+
+Revision ID: 009
+Revises: 008
+Create Date: 2024-01-15 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '009'
+down_revision = '008'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('strategies', sa.Column('win_rate_bp', sa.Integer(), nullable=False, server_default='0'))
+    op.execute('UPDATE strategies SET win_rate_bp = winning_trades * 10000 / total_trades WHERE total_trades > 0')
+    op.alter_column('strategies', 'win_rate_bp', server_default=None)
+
+
+def downgrade() -> None:
+    op.drop_column('strategies', 'win_rate_bp')
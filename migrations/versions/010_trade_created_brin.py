@@ -0,0 +1,24 @@
+"""Add a BRIN index on trades.created_at
+
+Revision ID: 010
+Revises: 009
+Create Date: 2024-01-15 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '010'
+down_revision = '009'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_trades_created_brin', 'trades', ['created_at'], unique=False,
+                    postgresql_using='brin', postgresql_with={'pages_per_range': 32})
+
+
+def downgrade() -> None:
+    op.drop_index('ix_trades_created_brin', table_name='trades')
@@ -0,0 +1,55 @@
+"""Store trade status, side and order type as CHECK-constrained VARCHAR
+
+Revision ID: 011
+Revises: 010
+Create Date: 2024-01-15 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '011'
+down_revision = '010'
+branch_labels = None
+depends_on = None
+
+# column -> (native enum type, CHECK constraint name, allowed values)
+ENUM_COLUMNS = {
+    'side': ('orderside', 'ck_trades_order_side', ('buy', 'sell')),
+    'order_type': ('ordertype', 'ck_trades_order_type', ('market', 'limit', 'stop_loss', 'stop_limit')),
+    'status': ('tradestatus', 'ck_trades_trade_status',
+               ('pending', 'submitted', 'filled', 'partially_filled', 'cancelled', 'rejected', 'failed')),
+}
+
+
+def _drop_status_indexes() -> None:
+    op.drop_index('ix_trades_strategy_filled', table_name='trades')
+    op.drop_index('ix_trades_user_open', table_name='trades')
+
+
+def upgrade() -> None:
+    # Partial index predicates reference the enum labels, so rebuild them around the change
+    _drop_status_indexes()
+    for column, (type_name, constraint, values) in ENUM_COLUMNS.items():
+        op.execute(f'ALTER TABLE trades ALTER COLUMN {column} TYPE VARCHAR(16) USING lower({column}::text)')
+        op.execute(f'DROP TYPE {type_name}')
+        allowed = ', '.join(f"'{value}'" for value in values)
+        op.create_check_constraint(op.f(constraint), 'trades', f'{column} IN ({allowed})')
+    op.create_index('ix_trades_user_open', 'trades', ['user_id', 'created_at'], unique=False,
+                    postgresql_where=sa.text("status IN ('pending', 'submitted', 'partially_filled')"))
+    op.create_index('ix_trades_strategy_filled', 'trades', ['strategy_id', 'filled_at'], unique=False,
+                    postgresql_where=sa.text("status = 'filled'"))
+
+
+def downgrade() -> None:
+    _drop_status_indexes()
+    for column, (type_name, constraint, values) in ENUM_COLUMNS.items():
+        op.drop_constraint(op.f(constraint), 'trades', type_='check')
+        labels = ', '.join(f"'{value.upper()}'" for value in values)
+        op.execute(f'CREATE TYPE {type_name} AS ENUM ({labels})')
+        op.execute(f'ALTER TABLE trades ALTER COLUMN {column} TYPE {type_name} USING upper({column})::{type_name}')
+    op.create_index('ix_trades_user_open', 'trades', ['user_id', 'created_at'], unique=False,
+                    postgresql_where=sa.text("status IN ('PENDING', 'SUBMITTED', 'PARTIALLY_FILLED')"))
+    op.create_index('ix_trades_strategy_filled', 'trades', ['strategy_id', 'filled_at'], unique=False,
+                    postgresql_where=sa.text("status = 'FILLED'"))
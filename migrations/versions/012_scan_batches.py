@@ -0,0 +1,36 @@
+"""Store Chartlink scan payloads once per scan instead of per alert
+
+Revision ID: 012
+Revises: 011
+Create Date: 2024-01-15 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '012'
+down_revision = '011'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('scan_batches',
+        sa.Column('id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('external_id', sa.String(length=100), nullable=False),
+        sa.Column('scan_name', sa.String(length=255), nullable=True),
+        sa.Column('triggered_at', sa.String(length=100), nullable=True),
+        sa.Column('stocks_count', sa.Integer(), nullable=False),
+        sa.Column('stocks', postgresql.JSONB(), nullable=False),
+        sa.Column('raw_payload', postgresql.JSONB(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_scan_batches_external_id'), 'scan_batches', ['external_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_scan_batches_external_id'), table_name='scan_batches')
+    op.drop_table('scan_batches')
@@ -0,0 +1,41 @@
+"""Make alerts unique per external id and user
+
+Revision ID: 013
+Revises: 012
+Create Date: 2024-01-15 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '013'
+down_revision = '012'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Earlier retries may have stored duplicates; keep the first row's external id.
+    # Rows are kept (trades may reference them) and NULLs never conflict.
+    op.execute("""
+        UPDATE alerts SET external_id = NULL
+        WHERE id IN (
+            SELECT id FROM (
+                SELECT id, row_number() OVER (
+                    PARTITION BY external_id, user_id ORDER BY created_at, id
+                ) AS rn
+                FROM alerts
+                WHERE external_id IS NOT NULL
+            ) ranked
+            WHERE rn > 1
+        )
+    """)
+    op.create_index('ix_alerts_external_user', 'alerts', ['external_id', 'user_id'], unique=True)
+    # The composite index serves external_id lookups on its own
+    op.drop_index(op.f('ix_alerts_external_id'), table_name='alerts')
+
+
+def downgrade() -> None:
+    op.create_index(op.f('ix_alerts_external_id'), 'alerts', ['external_id'], unique=False)
+    op.drop_index('ix_alerts_external_user', table_name='alerts')